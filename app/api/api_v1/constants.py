@@ -0,0 +1,8 @@
+# Response header with the keyset cursor of the next page of a listing
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Content type of the streamed exports, one JSON document per line
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Server error code of the writes violating a unique index
+DUPLICATE_KEY_ERROR_CODE = 11000
@@ -9,6 +9,8 @@ users_error_messages = dict(
     ),
     inactive_user="Inactive user",
     invalid_format_user_id="user_id <<{user_id}>> invalid format",
+    invalid_bulk_body="Expected a JSON array or NDJSON of users",
+    too_many_bulk_rows="At most <<{max_rows}>> users can be created at once",
 )
 
 user_roles_error_messages = dict(
@@ -31,8 +33,17 @@ account_error_messages = dict(
     ),
 )
 
+pagination_error_messages = dict(
+    invalid_cursor="Invalid cursor <<{cursor}>>",
+)
+
+monitoring_error_messages = dict(
+    profile_not_exists="Profile with id <<{profile_id}>> not exists",
+)
+
 authentication_error_messages = dict(
     error_to_validate_credentials="Could not validate credentials",
     not_enough_permissions="Not enough permissions",
     incorrect_credentials="Incorrect email or password",
+    invalid_refresh_token="Invalid refresh token",
 )
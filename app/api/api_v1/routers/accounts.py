@@ -1,26 +1,46 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Security
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Response,
+    Security,
+)
+from fastapi.responses import StreamingResponse
 from starlette import status
 
 from app import crud, models, schemas
 from app.api import deps
+from app.api.api_v1.constants import NDJSON_MEDIA_TYPE
 from app.api.api_v1.error_messages import (
     account_error_messages,
     users_error_messages,
 )
-from app.api.utils import is_valid_object_id
+from app.api.utils import (
+    is_valid_object_id,
+    iter_ndjson,
+    set_next_cursor_header,
+)
 from app.constants.role import Role
+from app.core.config import settings
+from app.core.timing import TimedRoute
 from app.schemas.validators import ObjectId
 
-router = APIRouter(prefix="/accounts", tags=["accounts"])
+router = APIRouter(
+    prefix="/accounts", tags=["accounts"], route_class=TimedRoute
+)
 
 
 @router.get("", response_model=List[schemas.Account])
 async def get_accounts(
     *,
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, gt=0, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Depends(deps.get_valid_cursor),
     current_user: models.User = Security(
         deps.get_current_active_user,
         scopes=[Role.ADMIN["name"], Role.SUPER_ADMIN["name"]],
@@ -29,19 +49,55 @@ async def get_accounts(
     """
     Retrieve all accounts.
     """
-    accounts = await crud.account.get_multi(skip=skip, limit=limit)
+    accounts = await crud.account.get_multi(
+        skip=skip, limit=limit, cursor=cursor
+    )
+    set_next_cursor_header(
+        response=response,
+        next_cursor=crud.account.get_next_cursor(
+            objects=accounts, limit=limit
+        ),
+    )
     return accounts
 
 
+@router.get("/export", response_class=StreamingResponse)
+async def export_accounts(
+    *,
+    current_user: models.User = Security(
+        deps.get_current_active_user,
+        scopes=[Role.ADMIN["name"], Role.SUPER_ADMIN["name"]],
+    ),
+) -> Any:
+    """
+    Export all accounts as newline delimited JSON.
+    """
+    return StreamingResponse(
+        iter_ndjson(objects=crud.account.iter_multi(), schema=schemas.Account),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+
+
 @router.get("/me", response_model=schemas.Account)
 async def get_account_for_user(
     *,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    principal: schemas.Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Retrieve account for a logged in user.
     """
-    account = await crud.account.get(_id=current_user.account_id)
+    account = (
+        await crud.account.get(_id=principal.account_id)
+        if principal.account_id
+        else None
+    )
+    if not account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=account_error_messages["account_not_exists"].format(
+                account_id=principal.account_id
+            ),
+        )
     return account
 
 
@@ -57,14 +113,6 @@ async def create_account(
     """
     Create an user account
     """
-    account = await crud.account.get_by_name(name=account_in.name)
-    if account:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=account_error_messages[
-                "account_with_name_already_exists"
-            ].format(name=account_in.name),
-        )
     account = await crud.account.create(obj_in=account_in)
     return account
 
@@ -96,16 +144,15 @@ async def add_user_to_account(
             ),
         )
 
-    user = await crud.user.get(_id=user_id)
-    if not user:
+    user_in = schemas.UserUpdate(account_id=account_id)
+    updated_user = await crud.user._update(_id=user_id, obj_in=user_in)
+    if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=users_error_messages["user_not_exists"].format(
                 user_id=user_id
             ),
         )
-    user_in = schemas.UserUpdate(account_id=account_id)
-    updated_user = await crud.user._update(_id=user_id, obj_in=user_in)
     return updated_user
 
 
@@ -138,7 +185,7 @@ async def update_account(
                 "user_without_permissions_to_update_account"
             ].format(user_id=current_user.id),
         )
-    account = await crud.account.get(_id=account_id)
+    account = await crud.account._update(_id=account_id, obj_in=account_in)
     if not account:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -146,7 +193,6 @@ async def update_account(
                 account_id=account_id
             ),
         )
-    account = await crud.account._update(_id=account_id, obj_in=account_in)
     return account
 
 
@@ -164,20 +210,14 @@ async def remove_account(
     """
     Remove an account.
     """
-    account = await crud.account.get(_id=account_id)
-    if not account:
+    account_deleted = await crud.account._remove(_id=account_id)
+    if account_deleted != 1:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=account_error_messages["account_not_exists"].format(
                 account_id=account_id
             ),
         )
-    account_deleted = await crud.account._remove(_id=account_id)
-    if account_deleted != 1:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Not is possible remove the account with id={account_id}",
-        )
 
     return {
         "success": f"Account with id={account_id} removed",
@@ -198,23 +238,24 @@ async def remove_partial_account(
     """
     Remove an account.
     """
-    account = await crud.account.get(_id=account_id)
-    if not account:
+    account_deleted = await crud.account.partial_remove(_id=account_id)
+    if not account_deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=account_error_messages["account_not_exists"].format(
                 account_id=account_id
             ),
         )
-    account_deleted = await crud.account.partial_remove(_id=account_id)
     return account_deleted
 
 
 @router.get("/{account_id}/users", response_model=List[schemas.User])
 async def retrieve_users_for_account(
     *,
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, gt=0, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Depends(deps.get_valid_cursor),
     account_id: ObjectId,
     current_user: models.User = Security(
         deps.get_current_active_user,
@@ -233,7 +274,13 @@ async def retrieve_users_for_account(
             ),
         )
     account_users = await crud.user.get_by_account_id(
-        account_id=account_id, skip=skip, limit=limit
+        account_id=account_id, skip=skip, limit=limit, cursor=cursor
+    )
+    set_next_cursor_header(
+        response=response,
+        next_cursor=crud.user.get_next_cursor(
+            objects=account_users, limit=limit
+        ),
     )
     return account_users
 
@@ -241,8 +288,10 @@ async def retrieve_users_for_account(
 @router.get("/users/me", response_model=List[schemas.User])
 async def retrieve_users_for_own_account(
     *,
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, gt=0, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Depends(deps.get_valid_cursor),
     current_user: models.User = Security(
         deps.get_current_active_user,
         scopes=[
@@ -255,8 +304,9 @@ async def retrieve_users_for_own_account(
     """
     Retrieve users for own account.
     """
-    account = await crud.account.get(_id=current_user.account_id)
-    if not account:
+    # The account was already joined to the user by the authentication
+    account = getattr(current_user, "account", None)
+    if not account or not account.get("is_active"):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=account_error_messages["account_not_exists"].format(
@@ -264,6 +314,12 @@ async def retrieve_users_for_own_account(
             ),
         )
     account_users = await crud.user.get_by_account_id(
-        account_id=account.id, skip=skip, limit=limit
+        account_id=account["_id"], skip=skip, limit=limit, cursor=cursor
+    )
+    set_next_cursor_header(
+        response=response,
+        next_cursor=crud.user.get_next_cursor(
+            objects=account_users, limit=limit
+        ),
     )
     return account_users
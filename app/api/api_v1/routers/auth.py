@@ -1,6 +1,7 @@
-from datetime import timedelta
-from typing import Any
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
 
+from bson import ObjectId
 from fastapi import APIRouter, Body, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from starlette import status
@@ -8,10 +9,13 @@ from starlette import status
 from app import crud, models, schemas
 from app.api import deps
 from app.api.api_v1.error_messages import authentication_error_messages
-from app.core import security
+from app.api.api_v1.success_messages import authentication_success_messages
 from app.core.config import settings
+from app.core.crypto import crypto_service
+from app.core.timing import TimedRoute
+from app.crud.revoked_token import get_jti_key
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=TimedRoute)
 
 
 @router.post("/access-token", response_model=schemas.Token)
@@ -30,24 +34,98 @@ async def login_access_token(
             detail=authentication_error_messages["incorrect_credentials"],
         )
 
-    access_token_expires = timedelta(
-        minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-    )
-
     role = "GUEST" if not hasattr(user, "role") else user.role.get("name")
     token_payload = {
         "id": str(user.id),
         "role": role,
-        "account_id": str(user.account_id),
+        "account_id": str(user.account_id) if user.account_id else None,
+        "ver": user.token_version,
     }
+    return await create_tokens(user_id=user.id, token_payload=token_payload)
+
+
+@router.post("/refresh-token", response_model=schemas.Token)
+async def refresh_access_token(
+    refresh_token: str = Body(..., embed=True),
+) -> Any:
+    """
+    Exchange a refresh token (once) for a new access and refresh token,
+    without the credentials
+    """
+    invalid_refresh_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=authentication_error_messages["invalid_refresh_token"],
+    )
+    previous_token = await crud.refresh_token.rotate(token=refresh_token)
+    if not previous_token:
+        raise invalid_refresh_token_exception
+    # The refresh tokens are revoked with the access tokens (e.g. on role
+    # changes) and when the user is deactivated
+    claims = await deps.get_principal_claims(user_id=previous_token.user_id)
+    if not claims or claims.get("token_version", 0) != (
+        previous_token.claims.get("ver")
+    ):
+        raise invalid_refresh_token_exception
+    return await create_tokens(
+        user_id=previous_token.user_id,
+        token_payload=previous_token.claims,
+        family_id=previous_token.family_id,
+    )
+
+
+async def create_tokens(
+    *,
+    user_id: ObjectId,
+    token_payload: Dict[str, Any],
+    family_id: Optional[ObjectId] = None,
+) -> Dict[str, str]:
+    access_token_expires = timedelta(
+        minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
+    )
+    refresh_token, _ = await crud.refresh_token.issue(
+        user_id=user_id, claims=token_payload, family_id=family_id
+    )
     return {
-        "access_token": security.create_access_token(
+        "access_token": await crypto_service.create_access_token(
             token_payload, expires_delta=access_token_expires
         ),
         "token_type": "bearer",
+        "refresh_token": refresh_token,
     }
 
 
+@router.post("/logout", response_model=Dict)
+async def logout(
+    refresh_token: Optional[str] = Body(None, embed=True),
+    token: str = Depends(deps.reusable_oauth2),
+    principal: schemas.Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Revoke the access token until it expires, and the refresh tokens of
+    its login when the refresh token is given
+    """
+    # Already verified (and cached) by the principal dependency
+    token_data = deps.decode_token(
+        token=token,
+        credentials_exception=HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=authentication_error_messages[
+                "error_to_validate_credentials"
+            ],
+        ),
+    )
+    if token_data.jti and token_data.exp:
+        await crud.revoked_token.revoke(
+            key=get_jti_key(token_data.jti),
+            expires_at=datetime.utcfromtimestamp(token_data.exp),
+        )
+    if refresh_token:
+        await crud.refresh_token.revoke(
+            token=refresh_token, user_id=principal.id
+        )
+    return {"success": authentication_success_messages["logged_out"]}
+
+
 @router.post("/test-token", response_model=schemas.User)
 async def test_token(
     current_user: models.User = Depends(deps.get_current_user),
@@ -59,10 +137,10 @@ async def test_token(
 
 
 @router.post("/hash-password", response_model=str)
-def hash_password(
+async def hash_password(
     password: str = Body(..., embed=True),
 ) -> Any:
     """
     Hash a password
     """
-    return security.get_password_hash(password)
+    return await crypto_service.get_password_hash(password)
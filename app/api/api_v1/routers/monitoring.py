@@ -0,0 +1,122 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, HTTPException, Security
+from fastapi.responses import PlainTextResponse
+from starlette import status
+
+from app import schemas
+from app.api import deps
+from app.api.api_v1.error_messages import monitoring_error_messages
+from app.constants.role import Role
+from app.core.cache import principal_cache, principal_claims_cache, token_cache
+from app.core.loop_monitor import loop_monitor
+from app.core.metrics import command_metrics
+from app.core.monitoring import pool_stats
+from app.core.profiling import profile_store
+from app.core.revocation import revocation_filter
+from app.core.timing import TimedRoute
+
+router = APIRouter(
+    prefix="/monitoring", tags=["monitoring"], route_class=TimedRoute
+)
+
+
+@router.get("/db-pool", response_model=Dict)
+async def get_db_pool_stats(
+    principal: schemas.Principal = Security(
+        deps.get_current_principal,
+        scopes=[Role.SUPER_ADMIN["name"]],
+    ),
+) -> Any:
+    """
+    Retrieve the connection pool statistics of each database server.
+    """
+    return pool_stats.stats()
+
+
+@router.get("/db-commands", response_model=Dict)
+async def get_db_commands_stats(
+    principal: schemas.Principal = Security(
+        deps.get_current_principal,
+        scopes=[Role.SUPER_ADMIN["name"]],
+    ),
+) -> Any:
+    """
+    Retrieve the latency percentiles of the database commands by command
+    name, collection and CRUD method.
+    """
+    return command_metrics.stats()
+
+
+@router.get("/caches", response_model=Dict)
+async def get_caches_stats(
+    principal: schemas.Principal = Security(
+        deps.get_current_principal,
+        scopes=[Role.SUPER_ADMIN["name"]],
+    ),
+) -> Any:
+    """
+    Retrieve the size and hit ratio of the caches of this worker.
+    """
+    return {
+        "principals": principal_cache.stats(),
+        "principal_claims": principal_claims_cache.stats(),
+        "tokens": token_cache.stats(),
+        "revocation_filter": revocation_filter.stats(),
+    }
+
+
+@router.get("/event-loop", response_model=Dict)
+async def get_event_loop_stats(
+    principal: schemas.Principal = Security(
+        deps.get_current_principal,
+        scopes=[Role.SUPER_ADMIN["name"]],
+    ),
+) -> Any:
+    """
+    Retrieve the event loop lag histogram of this worker and how many times
+    a callback blocked it.
+    """
+    return loop_monitor.stats()
+
+
+@router.get("/profiles", response_model=List[Dict])
+async def get_profiles(
+    principal: schemas.Principal = Security(
+        deps.get_current_principal,
+        scopes=[Role.SUPER_ADMIN["name"]],
+    ),
+) -> Any:
+    """
+    Retrieve the latest request profiles of this worker.
+    """
+    return profile_store.list()
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def download_profile(
+    profile_id: str,
+    principal: schemas.Principal = Security(
+        deps.get_current_principal,
+        scopes=[Role.SUPER_ADMIN["name"]],
+    ),
+) -> Any:
+    """
+    Download a request profile as collapsed stacks (flamegraph format).
+    """
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=monitoring_error_messages["profile_not_exists"].format(
+                profile_id=profile_id
+            ),
+        )
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="profile-{profile_id}.folded"'
+            )
+        },
+    )
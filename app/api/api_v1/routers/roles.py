@@ -1,25 +1,34 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Security
+from fastapi import APIRouter, Depends, Query, Response, Security
 
-from app import crud, models, schemas
+from app import crud, schemas
 from app.api import deps
+from app.api.utils import set_next_cursor_header
 from app.constants.role import Role
+from app.core.config import settings
+from app.core.timing import TimedRoute
 
-router = APIRouter(prefix="/roles", tags=["roles"])
+router = APIRouter(prefix="/roles", tags=["roles"], route_class=TimedRoute)
 
 
 @router.get("", response_model=List[schemas.Role])
 async def get_roles(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    current_user: models.User = Security(
-        deps.get_current_active_user,
+    limit: int = Query(100, gt=0, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Depends(deps.get_valid_cursor),
+    principal: schemas.Principal = Security(
+        deps.get_current_principal,
         scopes=[Role.ADMIN["name"], Role.SUPER_ADMIN["name"]],
     ),
 ) -> Any:
     """
     Retrieve all available user roles.
     """
-    roles = await crud.role.get_multi(skip=skip, limit=limit)
+    roles = await crud.role.get_multi(skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor_header(
+        response=response,
+        next_cursor=crud.role.get_next_cursor(objects=roles, limit=limit),
+    )
     return roles
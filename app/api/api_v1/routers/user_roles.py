@@ -7,9 +7,12 @@ from app import crud, models, schemas
 from app.api import deps
 from app.api.api_v1.error_messages import user_roles_error_messages
 from app.constants.role import Role
+from app.core.timing import TimedRoute
 from app.schemas.validators import ObjectId
 
-router = APIRouter(prefix="/user-roles", tags=["user-roles"])
+router = APIRouter(
+    prefix="/user-roles", tags=["user-roles"], route_class=TimedRoute
+)
 
 
 @router.post("", response_model=schemas.UserRole)
@@ -1,26 +1,49 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Security
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    Security,
+)
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from pydantic.networks import EmailStr
 from starlette import status
 
 from app import crud, models, schemas
 from app.api import deps
+from app.api.api_v1.constants import (
+    DUPLICATE_KEY_ERROR_CODE,
+    NDJSON_MEDIA_TYPE,
+)
 from app.api.api_v1.error_messages import users_error_messages
 from app.api.api_v1.success_messages import users_success_messages
-from app.api.utils import get_user_schema_with_role_and_account
+from app.api.utils import (
+    get_user_schema_with_role_and_account,
+    iter_ndjson,
+    parse_bulk_body,
+    set_next_cursor_header,
+)
 from app.constants.role import Role
 from app.core.config import settings
+from app.core.timing import TimedRoute
 from app.schemas.validators import ObjectId
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=TimedRoute)
 
 
 @router.get("", response_model=List[schemas.User])
 async def get_users(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, gt=0, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Depends(deps.get_valid_cursor),
     current_user: models.User = Security(
         deps.get_current_active_user,
         scopes=[Role.ADMIN["name"], Role.SUPER_ADMIN["name"]],
@@ -32,10 +55,31 @@ async def get_users(
     users = await crud.user.get_multi(
         skip=skip,
         limit=limit,
+        cursor=cursor,
+    )
+    set_next_cursor_header(
+        response=response,
+        next_cursor=crud.user.get_next_cursor(objects=users, limit=limit),
     )
     return users
 
 
+@router.get("/export", response_class=StreamingResponse)
+async def export_users(
+    current_user: models.User = Security(
+        deps.get_current_active_user,
+        scopes=[Role.ADMIN["name"], Role.SUPER_ADMIN["name"]],
+    ),
+) -> Any:
+    """
+    Export all users as newline delimited JSON.
+    """
+    return StreamingResponse(
+        iter_ndjson(objects=crud.user.iter_multi(), schema=schemas.User),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+
+
 @router.get("/me", response_model=schemas.User)
 async def get_me_user(
     current_user: models.User = Depends(deps.get_current_active_user),
@@ -81,14 +125,6 @@ async def create_user(
     """
     Create new user.
     """
-    user = await crud.user.get_by_email(email=user_in.email)
-    if user:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=users_error_messages[
-                "user_with_email_already_exists"
-            ].format(email=user_in.email),
-        )
     user = await crud.user.create(obj_in=user_in)
     return user
 
@@ -106,18 +142,68 @@ async def create_user_open(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=users_error_messages["created_user_open_not_allowed"],
         )
-    user = await crud.user.get_by_email(email=user_in.email)
-    if user:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=users_error_messages[
-                "user_with_email_already_exists"
-            ].format(email=user_in.email),
-        )
     user = await crud.user.create(obj_in=user_in)
     return user
 
 
+@router.post("/bulk", response_model=List[schemas.UserBulkResult])
+async def create_users_bulk(
+    *,
+    request: Request,
+    current_user: models.User = Security(
+        deps.get_current_active_user,
+        scopes=[Role.ADMIN["name"], Role.SUPER_ADMIN["name"]],
+    ),
+) -> Any:
+    """
+    Create users from a JSON array or NDJSON body, with one result (the
+    created id or the error) per input row.
+    """
+    try:
+        rows = parse_bulk_body(
+            body=await request.body(),
+            content_type=request.headers.get("content-type", ""),
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=users_error_messages["invalid_bulk_body"],
+        )
+    if len(rows) > settings.BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=users_error_messages["too_many_bulk_rows"].format(
+                max_rows=settings.BULK_MAX_ROWS
+            ),
+        )
+    results = [
+        schemas.UserBulkResult(index=index) for index in range(len(rows))
+    ]
+    users_in, indexes = [], []
+    for index, row in enumerate(rows):
+        try:
+            users_in.append(schemas.UserCreate.parse_obj(row))
+            indexes.append(index)
+        except ValidationError as exc:
+            results[index].error = "; ".join(
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                for error in exc.errors()
+            )
+    created = await crud.user.create_many(objs_in=users_in)
+    for index, user_in, (user_id, write_error) in zip(
+        indexes, users_in, created
+    ):
+        if not write_error:
+            results[index].id = user_id
+        elif write_error["code"] == DUPLICATE_KEY_ERROR_CODE:
+            results[index].error = users_error_messages[
+                "user_with_email_already_exists"
+            ].format(email=user_in.email)
+        else:
+            results[index].error = write_error["errmsg"]
+    return results
+
+
 @router.delete("/{user_id}/partial", response_model=schemas.User)
 async def remove_partial_user(
     *,
@@ -132,15 +218,14 @@ async def remove_partial_user(
     """
     Remove an user.
     """
-    user = await crud.user.get(_id=user_id)
-    if not user:
+    removed_partial_user = await crud.user.partial_remove(_id=user_id)
+    if not removed_partial_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=users_error_messages["user_not_exists"].format(
                 user_id=user_id
             ),
         )
-    removed_partial_user = await crud.user.partial_remove(_id=user_id)
     return removed_partial_user
 
 
@@ -158,14 +243,6 @@ async def remove_user(
     """
     Remove an user.
     """
-    user = await crud.user.get(_id=user_id)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=users_error_messages["user_not_exists"].format(
-                user_id=user_id
-            ),
-        )
     user_deleted = await crud.user._remove(_id=user_id)
     if user_deleted != 1:
         raise HTTPException(
@@ -197,7 +274,7 @@ async def update_user(
     """
     Update an user.
     """
-    user = await crud.user.get(_id=user_id)
+    user = await crud.user._update(_id=user_id, obj_in=user_in)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -205,7 +282,6 @@ async def update_user(
                 user_id=user_id
             ),
         )
-    user = await crud.user._update(_id=user_id, obj_in=user_in)
     return user
 
 
@@ -1,3 +1,7 @@
+authentication_success_messages = dict(
+    logged_out="Logged out",
+)
+
 users_success_messages = dict(
     user_removed="User with id <<{user_id}>> removed",
 )
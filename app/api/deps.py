@@ -1,19 +1,26 @@
+import hashlib
 import logging
-from typing import Optional
+import time
+from typing import Dict, Optional
 
 from fastapi import Depends, HTTPException, Security, status
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
-from jose import jwt
+from fastapi.security.utils import get_authorization_scheme_param
 from pydantic import ValidationError
 
 from app import crud, models, schemas
 from app.api.api_v1.error_messages import (
     authentication_error_messages,
+    pagination_error_messages,
     users_error_messages,
 )
 from app.constants.role import Role
 from app.core import security
+from app.core.cache import principal_cache, principal_claims_cache, token_cache
 from app.core.config import settings
+from app.core.timing import measure
+from app.crud.pagination import decode_cursor
+from app.crud.revoked_token import get_jti_key, get_user_version_key
 from app.schemas.validators import ObjectId
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -31,28 +38,46 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def get_current_user(
-    security_scopes: SecurityScopes,
-    token: str = Depends(reusable_oauth2),
-) -> models.User:
-    authenticate_value = (
+def get_authenticate_value(security_scopes: SecurityScopes) -> str:
+    return (
         f'Bearer scope="{security_scopes.scope_str}"'
         if security_scopes.scopes
         else "Bearer"
     )
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail=authentication_error_messages["error_to_validate_credentials"],
-        headers={"WWW-Authenticate": authenticate_value},
-    )
+
+
+def decode_token(
+    *, token: str, credentials_exception: HTTPException
+) -> schemas.TokenPayload:
+    """
+    Verified payload of the token, cached by token digest until the token
+    expires. The revocation checks (token version) of the callers run on
+    the cached payloads too.
+    """
+    with measure("jwt"):
+        key = hashlib.sha256(token.encode()).digest()
+        token_data = token_cache.get(key)
+        if token_data is None:
+            token_data = verify_token(
+                token=token,
+                key=key,
+                credentials_exception=credentials_exception,
+            )
+    return token_data
+
+
+def verify_token(
+    *, token: str, key: bytes, credentials_exception: HTTPException
+) -> schemas.TokenPayload:
+    """
+    Verify the signature and claims of the token, caching its payload
+    """
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
+        payload = security.jwt_backend.decode(token)
         if payload.get("id") is None:
             raise credentials_exception
         token_data = schemas.TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
+    except (security.InvalidTokenError, ValidationError):
         logger.error("Error Decoding Token", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,10 +85,30 @@ async def get_current_user(
                 "error_to_validate_credentials"
             ],
         )
+    ttl = token_cache.ttl
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    token_cache.set(key, token_data, ttl=ttl)
+    return token_data
 
-    user = await get_host_or_guest_user(user_id=token_data.id)
-    if not user:
-        raise credentials_exception
+
+async def is_token_revoked(token_data: schemas.TokenPayload) -> bool:
+    """
+    Whether the token (by jti) or the tokens of the user with its version
+    are revoked, usually from the revocation filter without a query
+    """
+    keys = [get_user_version_key(token_data.id, token_data.ver)]
+    if token_data.jti:
+        keys.append(get_jti_key(token_data.jti))
+    return await crud.revoked_token.is_revoked(keys=keys)
+
+
+def check_scopes(
+    *,
+    security_scopes: SecurityScopes,
+    token_data: schemas.TokenPayload,
+    authenticate_value: str,
+) -> None:
     if security_scopes.scopes and not token_data.role:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -80,9 +125,91 @@ async def get_current_user(
             detail=authentication_error_messages["not_enough_permissions"],
             headers={"WWW-Authenticate": authenticate_value},
         )
+
+
+async def get_current_user(
+    security_scopes: SecurityScopes,
+    token: str = Depends(reusable_oauth2),
+) -> models.User:
+    authenticate_value = get_authenticate_value(security_scopes)
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=authentication_error_messages["error_to_validate_credentials"],
+        headers={"WWW-Authenticate": authenticate_value},
+    )
+    token_data = decode_token(
+        token=token, credentials_exception=credentials_exception
+    )
+    if await is_token_revoked(token_data):
+        raise credentials_exception
+
+    user = await get_host_or_guest_user(user_id=token_data.id)
+    if not user:
+        raise credentials_exception
+    if token_data.ver != user.token_version:
+        # Token revoked (e.g. the role of the user changed)
+        raise credentials_exception
+    check_scopes(
+        security_scopes=security_scopes,
+        token_data=token_data,
+        authenticate_value=authenticate_value,
+    )
     return user
 
 
+async def get_current_principal(
+    security_scopes: SecurityScopes,
+    token: str = Depends(reusable_oauth2),
+) -> schemas.Principal:
+    """
+    Stateless authorization from the token claims. Only the token version
+    and account of the user are checked (cached), the user is not loaded.
+    """
+    authenticate_value = get_authenticate_value(security_scopes)
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=authentication_error_messages["error_to_validate_credentials"],
+        headers={"WWW-Authenticate": authenticate_value},
+    )
+    token_data = decode_token(
+        token=token, credentials_exception=credentials_exception
+    )
+    check_scopes(
+        security_scopes=security_scopes,
+        token_data=token_data,
+        authenticate_value=authenticate_value,
+    )
+    if await is_token_revoked(token_data):
+        raise credentials_exception
+
+    claims = await get_principal_claims(user_id=token_data.id)
+    if not claims or token_data.ver != claims.get("token_version", 0):
+        raise credentials_exception
+    return schemas.Principal(
+        id=token_data.id,
+        role=token_data.role,
+        account_id=claims.get("account_id"),
+        token_version=token_data.ver,
+    )
+
+
+async def is_profiling_authorized(authorization: Optional[str]) -> bool:
+    """
+    Whether the Authorization header carries a valid SUPER_ADMIN token, to
+    profile a request (see core.profiling)
+    """
+    scheme, token = get_authorization_scheme_param(authorization)
+    if scheme.lower() != "bearer":
+        return False
+    try:
+        await get_current_principal(
+            SecurityScopes(scopes=[Role.SUPER_ADMIN["name"]]), token=token
+        )
+    except HTTPException:
+        return False
+    return True
+
+
 async def get_current_active_user(
     current_user: models.User = Security(
         get_current_user,
@@ -97,12 +224,49 @@ async def get_current_active_user(
     return current_user
 
 
+async def get_principal_claims(*, user_id: ObjectId) -> Optional[Dict]:
+    claims = principal_claims_cache.get(str(user_id))
+    if claims is not None:
+        return claims
+    claims = await crud.user.get_principal_claims(_id=user_id)
+    if claims:
+        principal_claims_cache.set(str(user_id), claims)
+    return claims
+
+
+async def get_principal_user(
+    *, principal: schemas.Principal
+) -> Optional[models.User]:
+    """
+    Load the user of a stateless principal, for handlers needing its fields
+    """
+    return await get_host_or_guest_user(user_id=principal.id)
+
+
 async def get_host_or_guest_user(
     *, user_id: ObjectId
 ) -> Optional[models.User]:
-    # HOST user
+    user = principal_cache.get(str(user_id))
+    if user is not None:
+        return user
     user = await crud.user._get_with_account_and_role(_filter={"_id": user_id})
-    if not user:
-        # GUEST user
-        user = await crud.user.get(_id=str(user_id))
+    if isinstance(user, models.User) and not user.is_active:
+        # GUEST user must be active
+        return None
+    if user:
+        principal_cache.set(str(user_id), user)
     return user
+
+
+def get_valid_cursor(cursor: Optional[str] = None) -> Optional[str]:
+    if cursor is not None:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=pagination_error_messages["invalid_cursor"].format(
+                    cursor=cursor
+                ),
+            )
+    return cursor
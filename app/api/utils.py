@@ -1,14 +1,49 @@
-from typing import Optional
+import json
+from typing import Any, AsyncIterator, List, Optional, Type
 
 from bson import ObjectId
+from fastapi import Response
+from pydantic import BaseModel
 
 from app import models, schemas
+from app.api.api_v1.constants import NDJSON_MEDIA_TYPE, NEXT_CURSOR_HEADER
+from app.models.base import Base
 
 
 def is_valid_object_id(value):
     return ObjectId.is_valid(value)
 
 
+def set_next_cursor_header(
+    *, response: Response, next_cursor: Optional[str]
+) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+async def iter_ndjson(
+    *, objects: AsyncIterator[Base], schema: Type[BaseModel]
+) -> AsyncIterator[str]:
+    """
+    Encode each object with the response schema as one JSON line
+    """
+    async for obj in objects:
+        yield schema.from_orm(obj).json() + "\n"
+
+
+def parse_bulk_body(*, body: bytes, content_type: str) -> List[Any]:
+    """
+    Rows of a JSON array or, for the NDJSON content type, of one JSON
+    document per line. Raise ValueError when the body is malformed
+    """
+    if content_type.startswith(NDJSON_MEDIA_TYPE):
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    rows = json.loads(body)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array")
+    return rows
+
+
 def get_user_schema_with_role_and_account(
     *, user: models.User
 ) -> Optional[schemas.User]:
@@ -0,0 +1,55 @@
+import hashlib
+import math
+from typing import Tuple
+
+
+class BloomFilter:
+    """
+    Set membership with false positives (about error_rate up to capacity
+    keys) and without false negatives, in a fixed size bit array
+    """
+
+    def __init__(self, *, capacity: int, error_rate: float):
+        self.capacity: int = max(capacity, 1)
+        self.error_rate: float = error_rate
+        self.size: int = max(
+            int(
+                math.ceil(
+                    -self.capacity * math.log(error_rate) / (math.log(2) ** 2)
+                )
+            ),
+            8,
+        )
+        self.hashes: int = max(
+            int(round(self.size / self.capacity * math.log(2))), 1
+        )
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count: int = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @staticmethod
+    def _hash(key: str) -> Tuple[int, int]:
+        # Double hashing (Kirsch-Mitzenmacher) of a single 128 bits digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        return (
+            int.from_bytes(digest[:8], "little"),
+            int.from_bytes(digest[8:], "little") | 1,
+        )
+
+    def add(self, key: str) -> None:
+        first, second = self._hash(key)
+        for i in range(self.hashes):
+            position = (first + i * second) % self.size
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        first, second = self._hash(key)
+        bits, size = self._bits, self.size
+        for i in range(self.hashes):
+            position = (first + i * second) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
@@ -13,17 +13,64 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # jose, pyjwt (if installed) or hs256 (see core.security)
+    JWT_BACKEND: str = "jose"
+    # With ALGORITHM=RS256 or EdDSA: {kid: path of the PEM private key}
+    # (JSON), the tokens are signed with the JWT_SIGNING_KID one
+    JWT_SIGNING_KEYS: Dict[str, str] = {}
+    JWT_SIGNING_KID: Optional[str] = None
+    JWKS_MAX_AGE_SECONDS: int = 300
     USERS_OPEN_REGISTRATION: str
     FIRST_SUPER_ADMIN_EMAIL: str
     FIRST_SUPER_ADMIN_PASSWORD: str
     FIRST_SUPER_ADMIN_ACCOUNT_NAME: str
     FIRST_SUPER_ADMIN_PHONE_NUMBER: str
+    CRYPTO_PROCESS_POOL_SIZE: int = 2
+    # Off by default: the phases of an unauthenticated request (e.g. the
+    # crypto one of a login) would tell whether an email exists
+    SERVER_TIMING_HEADER: bool = False
+    # Debug X-DB-Commands header (see core.timing)
+    DB_COMMANDS_HEADER: bool = False
+    # On demand profiling of the requests (see core.profiling)
+    PROFILING_ENABLED: bool = False
+    PROFILING_INTERVAL_MS: float = 2
+    PROFILING_MAX_SECONDS: float = 30
+    PROFILING_MAX_PROFILES: int = 20
+    # Event loop lag monitor (see core.loop_monitor)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_LAG_INTERVAL_MS: float = 50
+    LOOP_BLOCKED_THRESHOLD_MS: float = 100
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60
+    PRINCIPAL_CLAIMS_CACHE_TTL_SECONDS: float = 30
+    # Verified tokens, each one until its exp at the latest
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: float = 300
+    # Bloom filter of the revoked tokens (see core.revocation)
+    REVOCATION_FILTER_CAPACITY: int = 100000
+    REVOCATION_FILTER_ERROR_RATE: float = 0.001
+    REVOCATION_SYNC_SECONDS: float = 5
+    REVOCATION_REBUILD_SECONDS: float = 600
+    MAX_PAGE_SIZE: int = 1000
+    EXPORT_BATCH_SIZE: int = 1000
+    BULK_INSERT_CHUNK_SIZE: int = 500
+    BULK_MAX_ROWS: int = 10000
+    SLOW_QUERY_THRESHOLD_MS: float = 100
 
     DB_HOST: str
     DB_PORT: int
     DB_NAME: str
 
     MONGO_DATABASE_URI: str = None
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 30000
+    # Comma separated wire compressors, e.g. "zstd,snappy,zlib" (zstd and
+    # snappy need the zstandard and python-snappy packages)
+    MONGO_COMPRESSORS: Optional[str] = None
 
     @validator("MONGO_DATABASE_URI", pre=True)
     def assemble_db_connection(
@@ -1,14 +1,19 @@
 from abc import ABC
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from motor.motor_asyncio import AsyncIOMotorClient
 from umongo.frameworks import MotorAsyncIOInstance
 
+from app.core.metrics import command_metrics
+from app.core.monitoring import pool_stats
+
 
 class MongoAsync(ABC):
     def __init__(self, uri: str = None, db_name: str = None):
         self.uri: str = uri
         self.db_name: str = db_name
+        # Keyword options of the client (pool size, compression, timeouts)
+        self.client_options: Dict[str, Any] = {}
         self._client: Optional[AsyncIOMotorClient] = None
         self._db: Optional[AsyncIOMotorClient] = None
         self._instance = MotorAsyncIOInstance()
@@ -19,7 +24,16 @@ class MongoAsync(ABC):
         if not self.db_name:
             raise ValueError("the database name is not defined")
 
-        self._client = AsyncIOMotorClient(self.uri)
+        client_options = {
+            option: value
+            for option, value in self.client_options.items()
+            if value is not None
+        }
+        self._client = AsyncIOMotorClient(
+            self.uri,
+            event_listeners=[pool_stats, command_metrics],
+            **client_options,
+        )
         self._db = self._client[self.db_name]
         self._instance.set_db(self._db)
 
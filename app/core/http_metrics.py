@@ -0,0 +1,155 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# Route label of the requests not matching any route (e.g. 404s), so the
+# raw paths never become labels
+UNMATCHED_ROUTE = "<unmatched>"
+# Method label of the requests with any other method, so the method tokens
+# sent by the clients never become labels
+HTTP_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+)
+OTHER_METHOD = "other"
+
+
+class RequestMetrics:
+    """
+    Prometheus style request count, in flight gauge and latency histograms,
+    labelled by method, route template and status. Only updated from the
+    event loop, so no locking is needed.
+    """
+
+    def __init__(self, *, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets: Tuple[float, ...] = buckets
+        self.in_flight: int = 0
+        self._counts: Dict[Tuple[str, str, int], List[int]] = {}
+        self._sums: Dict[Tuple[str, str, int], float] = defaultdict(float)
+
+    def observe(
+        self, method: str, route: str, status: int, seconds: float
+    ) -> None:
+        # Positional arguments, this runs on every request
+        labels = (method, route, status)
+        counts = self._counts.get(labels)
+        if counts is None:
+            # One count per bucket plus the +Inf one
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, seconds)] += 1
+        self._sums[labels] += seconds
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            "# HELP http_requests_in_flight Requests being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_total Requests served.",
+            "# TYPE http_requests_total counter",
+        ]
+        series = sorted(self._counts.items())
+        for (method, route, status), counts in series:
+            lines.append(
+                f'http_requests_total{{method="{method}",route="{route}",'
+                f'status="{status}"}} {sum(counts)}'
+            )
+        lines += [
+            "# HELP http_request_duration_seconds Request latency.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), counts in series:
+            labels = f'method="{method}",route="{route}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(
+                    f"http_request_duration_seconds_bucket"
+                    f'{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f"http_request_duration_seconds_sum{{{labels}}} "
+                f"{self._sums[(method, route, status)]}"
+            )
+            lines.append(
+                f"http_request_duration_seconds_count{{{labels}}} "
+                f"{cumulative}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        self._counts.clear()
+        self._sums.clear()
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording the request metrics, labelled by the
+    template of the matched route (e.g. "/api/v1/users/{user_id}")
+    """
+
+    def __init__(self, app: Callable, metrics: RequestMetrics = None):
+        self.app = app
+        self.metrics: RequestMetrics = metrics or request_metrics
+        self._route_templates: Optional[Dict[Callable, str]] = None
+
+    def _get_route(self, scope: Dict) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._route_templates is None:
+            self._route_templates = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._route_templates.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        if method not in HTTP_METHODS:
+            method = OTHER_METHOD
+        metrics = self.metrics
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight -= 1
+            metrics.observe(
+                method,
+                self._get_route(scope),
+                status,
+                time.perf_counter() - start,
+            )
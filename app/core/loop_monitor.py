@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Event loop lag histogram, from a task sleeping interval seconds and
+    measuring how late it wakes up, and a watchdog thread logging the stack
+    of the loop thread when a callback blocks it for more than threshold_ms
+    """
+
+    def __init__(self, *, interval: float, threshold_ms: float):
+        self.interval: float = interval
+        self.threshold_ms: float = threshold_ms
+        self.lag: Histogram = Histogram()
+        self.blocked: int = 0
+        self._heartbeat: float = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start monitoring the running loop"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._watchdog.join()
+        self._task = self._watchdog = None
+
+    async def _measure(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.lag.record((now - start - self.interval) * 1e6)
+            self._heartbeat = time.monotonic()
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        threshold = self.threshold_ms / 1000
+        while not self._stop.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            # One report per blocking callback
+            if blocked_for < threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self.blocked += 1
+            logger.warning(
+                "Event loop blocked for more than %.0fms in:\n%s",
+                blocked_for * 1000,
+                "".join(traceback.format_stack(frame)),
+            )
+
+    def stats(self) -> Dict[str, float]:
+        return {**self.lag.snapshot(), "blocked": self.blocked}
+
+
+loop_monitor = LoopLagMonitor(
+    interval=settings.LOOP_LAG_INTERVAL_MS / 1000,
+    threshold_ms=settings.LOOP_BLOCKED_THRESHOLD_MS,
+)
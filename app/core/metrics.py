@@ -0,0 +1,238 @@
+import functools
+import inspect
+import logging
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.core.timing import request_timing
+
+logger = logging.getLogger(__name__)
+
+# CRUD method (e.g. "CRUDUser.get_by_email") issuing the current commands
+db_operation: ContextVar[Optional[str]] = ContextVar(
+    "db_operation", default=None
+)
+
+
+class Histogram:
+    """
+    HDR style histogram of durations (recorded in microseconds): the buckets
+    are exact up to 2 ** precision_bits and log-linear above, so any
+    percentile is within 1 / 2 ** (precision_bits - 1) of its real value.
+    """
+
+    def __init__(self, *, precision_bits: int = 7):
+        self.precision_bits: int = precision_bits
+        self._buckets: Dict[Tuple[int, int], int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.count: int = 0
+        self.total: int = 0
+        self.max: int = 0
+
+    def _bucket(self, value: int) -> Tuple[int, int]:
+        shift = max(value.bit_length() - self.precision_bits, 0)
+        return shift, value >> shift
+
+    def record(self, micros: int) -> None:
+        micros = max(int(micros), 0)
+        with self._lock:
+            self._buckets[self._bucket(micros)] += 1
+            self.count += 1
+            self.total += micros
+            self.max = max(self.max, micros)
+
+    def percentile(self, quantile: float) -> int:
+        """Lower bound (microseconds) of the bucket of the quantile"""
+        with self._lock:
+            buckets = sorted(
+                (sub_bucket << shift, count)
+                for (shift, sub_bucket), count in self._buckets.items()
+            )
+            count = self.count
+        rank = quantile * count
+        seen = 0
+        for value, bucket_count in buckets:
+            seen += bucket_count
+            if seen >= rank:
+                return value
+        return 0
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count / 1000 if self.count else 0,
+            "p50_ms": self.percentile(0.5) / 1000,
+            "p90_ms": self.percentile(0.9) / 1000,
+            "p99_ms": self.percentile(0.99) / 1000,
+            "max_ms": self.max / 1000,
+        }
+
+
+def track_db_operation(func: Callable) -> Callable:
+    """
+    Attribute the commands issued by a CRUD method to
+    "<CRUD class>.<method>", the innermost decorated method wins
+    """
+    if inspect.isasyncgenfunction(func):
+
+        @functools.wraps(func)
+        async def generator_wrapper(self, *args, **kwargs):
+            operation = f"{type(self).__name__}.{func.__name__}"
+            items = func(self, *args, **kwargs)
+            while True:
+                # Only the fetches are attributed, not the consumer's code
+                token = db_operation.set(operation)
+                try:
+                    item = await items.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    db_operation.reset(token)
+                yield item
+
+        return generator_wrapper
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        token = db_operation.set(f"{type(self).__name__}.{func.__name__}")
+        try:
+            return await func(self, *args, **kwargs)
+        finally:
+            db_operation.reset(token)
+
+    return wrapper
+
+
+def get_query_shape(value: Any) -> Any:
+    """
+    Redact the values of a filter or pipeline, keeping its fields and
+    operators (e.g. {"email": "?", "age": {"$gt": "?"}})
+    """
+    if isinstance(value, dict):
+        return {key: get_query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [get_query_shape(item) for item in value]
+    return "?"
+
+
+# Field of each command with its filter (or pipeline)
+QUERY_FIELDS = {
+    "find": "filter",
+    "aggregate": "pipeline",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+}
+# Field of each write command with the list of statements and their filter
+WRITE_QUERY_FIELDS = {"update": ("updates", "q"), "delete": ("deletes", "q")}
+
+
+def get_command_query_shape(command_name: str, command: Dict) -> Any:
+    if command_name in QUERY_FIELDS:
+        return get_query_shape(command.get(QUERY_FIELDS[command_name], {}))
+    if command_name in WRITE_QUERY_FIELDS:
+        statements_field, query_field = WRITE_QUERY_FIELDS[command_name]
+        return [
+            get_query_shape(statement.get(query_field, {}))
+            for statement in command.get(statements_field, [])
+        ]
+    return None
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Duration histograms of the commands by command name, collection and
+    CRUD method, and a log of the commands slower than slow_query_ms
+    """
+
+    def __init__(self, *, slow_query_ms: float):
+        self.slow_query_ms: float = slow_query_ms
+        self._lock = threading.Lock()
+        self._started: Dict[Tuple[Any, int], Tuple] = {}
+        self.by_command: Dict[str, Histogram] = defaultdict(Histogram)
+        self.by_collection: Dict[str, Histogram] = defaultdict(Histogram)
+        self.by_operation: Dict[str, Histogram] = defaultdict(Histogram)
+
+    def started(self, event):
+        collection = event.command.get(
+            # getMore carries the cursor id, not the collection
+            "collection"
+            if event.command_name == "getMore"
+            else event.command_name
+        )
+        if not isinstance(collection, str):
+            collection = None
+        timing = request_timing.get()
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (
+                event.command_name,
+                collection,
+                db_operation.get(),
+                event.command,
+                timing,
+            )
+            if timing is not None:
+                timing.db_commands += 1
+
+    def _finished(self, event) -> None:
+        with self._lock:
+            started = self._started.pop(
+                (event.connection_id, event.request_id), None
+            )
+            if started is None:
+                return
+            command_name, collection, operation, command, timing = started
+            self.by_command[command_name].record(event.duration_micros)
+            if collection:
+                self.by_collection[collection].record(event.duration_micros)
+            if operation:
+                self.by_operation[operation].record(event.duration_micros)
+        if timing is not None:
+            timing.add("db", event.duration_micros / 1e6)
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= self.slow_query_ms:
+            logger.warning(
+                "Slow query: %s.%s by %s took %.1fms, shape=%s",
+                collection,
+                command_name,
+                operation,
+                duration_ms,
+                get_command_query_shape(command_name, command),
+            )
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        with self._lock:
+            histograms = {
+                "commands": dict(self.by_command),
+                "collections": dict(self.by_collection),
+                "operations": dict(self.by_operation),
+            }
+        return {
+            group: {
+                name: histogram.snapshot()
+                for name, histogram in sorted(group_histograms.items())
+            }
+            for group, group_histograms in histograms.items()
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.by_command.clear()
+            self.by_collection.clear()
+            self.by_operation.clear()
+
+
+command_metrics = CommandMetricsListener(
+    slow_query_ms=settings.SLOW_QUERY_THRESHOLD_MS
+)
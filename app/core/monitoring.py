@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict
+
+from pymongo import monitoring
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Connection pool statistics of each server, to size the pools per worker.
+    The driver publishes the events from its own threads.
+    """
+
+    # Window (seconds) of the connection creation rate
+    rate_window: float = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self._created_at: Dict[str, Deque[float]] = defaultdict(deque)
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def _count(self, event, counter: str, delta: int = 1) -> None:
+        with self._lock:
+            self._pools[self._address(event)][counter] += delta
+
+    def pool_created(self, event):
+        self._count(event, "pools_created")
+
+    def pool_cleared(self, event):
+        self._count(event, "pools_cleared")
+
+    def pool_closed(self, event):
+        self._count(event, "pools_closed")
+
+    def connection_created(self, event):
+        with self._lock:
+            address = self._address(event)
+            self._pools[address]["connections_created"] += 1
+            self._pools[address]["open"] += 1
+            now = time.monotonic()
+            self._created_at[address].append(now)
+            self._prune(address, now)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            address = self._address(event)
+            self._pools[address]["connections_closed"] += 1
+            self._pools[address]["open"] -= 1
+
+    def connection_check_out_started(self, event):
+        self._count(event, "wait_queue")
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            address = self._address(event)
+            self._pools[address]["wait_queue"] -= 1
+            self._pools[address]["check_out_failures"] += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            address = self._address(event)
+            self._pools[address]["wait_queue"] -= 1
+            self._pools[address]["checked_out"] += 1
+            self._pools[address]["checked_out_total"] += 1
+
+    def connection_checked_in(self, event):
+        self._count(event, "checked_out", -1)
+
+    def _prune(self, address: str, now: float) -> None:
+        # Called with the lock held, keeps the creations of the window only
+        created_at = self._created_at[address]
+        while created_at and created_at[0] < now - self.rate_window:
+            created_at.popleft()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic()
+        stats = {}
+        with self._lock:
+            for address, counters in self._pools.items():
+                self._prune(address, now)
+                created_at = self._created_at[address]
+                stats[address] = {
+                    **counters,
+                    "connections_created_per_minute": (
+                        len(created_at) * 60 / self.rate_window
+                    ),
+                }
+        return stats
+
+
+pool_stats = PoolStatsListener()
@@ -0,0 +1,185 @@
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.core.config import settings
+
+# Request header asking to profile the request
+PROFILE_HEADER = b"x-profile"
+# Response header with the id of the stored profile
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+class SamplingProfiler:
+    """
+    Sample the stack of a thread (the event loop) every interval seconds from
+    a background thread, counting the collapsed stacks (flamegraph format)
+    """
+
+    def __init__(self, *, thread_id: int, interval: float, max_seconds: float):
+        self.thread_id: int = thread_id
+        self.interval: float = interval
+        self.max_seconds: float = max_seconds
+        self.stacks: Counter = Counter()
+        self.samples: int = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval):
+            if time.monotonic() > deadline:
+                return
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} "
+                    f"({code.co_filename}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+
+class Profile:
+    def __init__(self, *, method: str, path: str):
+        self.id: str = uuid.uuid4().hex
+        self.method: str = method
+        self.path: str = path
+        self.started_at: datetime = datetime.utcnow()
+        self.duration_ms: float = 0
+        self.samples: int = 0
+        self.stacks: Counter = Counter()
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "samples": self.samples,
+        }
+
+    def collapsed(self) -> str:
+        """
+        One "frame;frame;... count" line per stack, the input of
+        flamegraph.pl and speedscope
+        """
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+class ProfileStore:
+    """Bounded ring of the latest profiles of the worker"""
+
+    def __init__(self, *, maxlen: int):
+        self._profiles: Deque[Profile] = deque(maxlen=maxlen)
+
+    def add(self, profile: Profile) -> None:
+        self._profiles.append(profile)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        for profile in self._profiles:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    def list(self) -> List[Dict]:
+        return [profile.summary() for profile in reversed(self._profiles)]
+
+    def clear(self) -> None:
+        self._profiles.clear()
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware profiling the requests with the profile header
+    whose Authorization header is accepted by authorize. At most one
+    request is profiled at a time, the others are served unprofiled.
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        *,
+        authorize: Callable[[Optional[str]], Awaitable[bool]],
+        store: ProfileStore,
+        interval: float,
+        max_seconds: float,
+    ):
+        self.app = app
+        self.authorize = authorize
+        self.store: ProfileStore = store
+        self.interval: float = interval
+        self.max_seconds: float = max_seconds
+        self._busy: bool = False
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or self._busy:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if PROFILE_HEADER not in headers:
+            await self.app(scope, receive, send)
+            return
+        # Taken before the authorization await, so it is one at a time
+        self._busy = True
+        try:
+            authorization = headers.get(b"authorization", b"").decode()
+            if not await self.authorize(authorization):
+                await self.app(scope, receive, send)
+                return
+            await self._profile(scope, receive, send)
+        finally:
+            self._busy = False
+
+    async def _profile(self, scope, receive, send) -> None:
+        profile = Profile(method=scope["method"], path=scope["path"])
+
+        async def send_with_profile_id(message) -> None:
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (PROFILE_ID_HEADER, profile.id.encode()),
+                    ],
+                }
+            await send(message)
+
+        profiler = SamplingProfiler(
+            thread_id=threading.get_ident(),
+            interval=self.interval,
+            max_seconds=self.max_seconds,
+        )
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            profile.duration_ms = (time.perf_counter() - start) * 1000
+            profile.samples = profiler.samples
+            profile.stacks = profiler.stacks
+            self.store.add(profile)
+
+
+profile_store = ProfileStore(maxlen=settings.PROFILING_MAX_PROFILES)
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Re-read before the last sync, for the clock skew between the workers
+SYNC_OVERLAP = timedelta(seconds=60)
+
+# Revoked keys created since a date (all of them without date)
+KeysLoader = Callable[[Optional[datetime]], AsyncIterator[str]]
+
+
+class RevocationFilter:
+    """
+    Bloom filter mirror (per worker) of the revoked token keys stored in
+    the database: a key not in the filter is not revoked, and only the
+    positives (revoked or false positive) are checked in the database.
+
+    Synced every interval seconds with the keys revoked since the last sync
+    and rebuilt every rebuild_interval seconds, without the expired keys
+    and sized for the revoked ones. The keys revoked by this worker are
+    added right away, the ones of the other workers after a sync.
+    """
+
+    def __init__(
+        self,
+        *,
+        capacity: int,
+        error_rate: float,
+        interval: float,
+        rebuild_interval: float,
+    ):
+        self.capacity: int = capacity
+        self.error_rate: float = error_rate
+        self.interval: float = interval
+        self.rebuild_interval: float = rebuild_interval
+        self.loader: Optional[KeysLoader] = None
+        self.filter = BloomFilter(capacity=capacity, error_rate=error_rate)
+        self.syncs: int = 0
+        self.rebuilds: int = 0
+        self.positives: int = 0
+        self.false_positives: int = 0
+        self._synced_at: Optional[datetime] = None
+        self._rebuilt_at: float = 0
+        # Keys added while rebuilding, to add to the new filter as well
+        self._added: Optional[List[str]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, key: str) -> None:
+        self.filter.add(key)
+        if self._added is not None:
+            self._added.append(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.filter
+
+    async def sync(self, *, rebuild: bool = False) -> None:
+        started_at = datetime.utcnow()
+        if rebuild or self._synced_at is None:
+            await self._rebuild()
+        else:
+            async for key in self.loader(self._synced_at - SYNC_OVERLAP):
+                # Re-read in the overlap or added by this worker: counted
+                # once, for the capacity check of the rebuilds
+                if key not in self.filter:
+                    self.filter.add(key)
+        self._synced_at = started_at
+        self.syncs += 1
+
+    async def _rebuild(self) -> None:
+        self._added = []
+        try:
+            keys = [key async for key in self.loader(None)]
+            new_filter = BloomFilter(
+                capacity=max(self.capacity, 2 * len(keys)),
+                error_rate=self.error_rate,
+            )
+            for key in keys + self._added:
+                new_filter.add(key)
+        finally:
+            self._added = None
+        self.filter = new_filter
+        self._rebuilt_at = time.monotonic()
+        self.rebuilds += 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            rebuild = (
+                time.monotonic() - self._rebuilt_at >= self.rebuild_interval
+                # Sized for the revoked keys at the last rebuild
+                or len(self.filter) > self.filter.capacity
+            )
+            try:
+                await self.sync(rebuild=rebuild)
+            except Exception:
+                # Kept running, with the last synced filter
+                logger.exception("Error syncing the revocation filter")
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self.filter),
+            "capacity": self.filter.capacity,
+            "error_rate": self.error_rate,
+            "syncs": self.syncs,
+            "rebuilds": self.rebuilds,
+            "positives": self.positives,
+            "false_positives": self.false_positives,
+        }
+
+
+revocation_filter = RevocationFilter(
+    capacity=settings.REVOCATION_FILTER_CAPACITY,
+    error_rate=settings.REVOCATION_FILTER_ERROR_RATE,
+    interval=settings.REVOCATION_SYNC_SECONDS,
+    rebuild_interval=settings.REVOCATION_REBUILD_SECONDS,
+)
@@ -1,14 +1,345 @@
+import base64
+import binascii
+import calendar
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
-from typing import Any, Union
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
 
-from jose import jwt
+from jose import jwk, jwt
+from jose.exceptions import JOSEError
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
+try:
+    import jwt as pyjwt
+except ImportError:  # PyJWT is optional
+    pyjwt = None
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 ALGORITHM = settings.ALGORITHM
+# Signed with the private key of the current kid, verified with the public
+# keys published in the JWKS (see JWTBackend.jwks)
+ASYMMETRIC_ALGORITHMS = ("RS256", "EdDSA")
+
+
+class InvalidTokenError(Exception):
+    """Malformed token, bad signature or claims (e.g. expired)"""
+
+
+class JWTBackend(ABC):
+    """
+    Issue and verify the access tokens. Every backend verifies the
+    signature with the configured algorithm only, requires the exp claim
+    and validates the exp, nbf and iat claims without leeway.
+
+    With an asymmetric algorithm the tokens are signed with the private key
+    of signing_kid (set as the kid header) and verified with the public key
+    of their kid, any of the signing_keys (kid: PEM private key), so the
+    keys can be rotated without invalidating the issued tokens.
+    """
+
+    def __init__(
+        self,
+        *,
+        secret_key: str,
+        algorithm: str,
+        signing_keys: Optional[Dict[str, str]] = None,
+        signing_kid: Optional[str] = None,
+    ):
+        self.secret_key: str = secret_key
+        self.algorithm: str = algorithm
+        self.signing_kid: Optional[str] = None
+        self.private_keys: Dict[str, Any] = {}
+        self.public_keys: Dict[str, Any] = {}
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            return
+        signing_keys = signing_keys or {}
+        if signing_kid not in signing_keys:
+            raise ValueError(
+                f"The {algorithm} algorithm needs the private key of the "
+                f"signing kid {signing_kid!r}"
+            )
+        for kid, pem in signing_keys.items():
+            self.private_keys[kid], self.public_keys[kid] = self.load_key(pem)
+        self.signing_kid = signing_kid
+
+    @abstractmethod
+    def load_key(self, pem: str) -> Tuple[Any, Any]:
+        """Private and public key objects of a PEM private key"""
+
+    @abstractmethod
+    def public_jwk(self, public_key: Any) -> Dict[str, Any]:
+        """Public JWK members (kty and key parameters) of a public key"""
+
+    def get_public_key(self, kid: Any) -> Any:
+        if kid not in self.public_keys:
+            raise InvalidTokenError(f"Unknown kid {kid!r}")
+        return self.public_keys[kid]
+
+    def jwks(self) -> Dict[str, Any]:
+        """JWK Set of the public keys, empty for the HMAC algorithms"""
+        return {
+            "keys": [
+                {
+                    **self.public_jwk(public_key),
+                    "kid": kid,
+                    "use": "sig",
+                    "alg": self.algorithm,
+                }
+                for kid, public_key in self.public_keys.items()
+            ]
+        }
+
+    @abstractmethod
+    def encode(self, claims: Dict[str, Any]) -> str:
+        pass
+
+    @abstractmethod
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verified claims of the token, or raise InvalidTokenError"""
+
+
+class JoseBackend(JWTBackend):
+    """RS256 with the rsa package, EdDSA is not supported by jose"""
+
+    def load_key(self, pem: str) -> Tuple[Any, Any]:
+        try:
+            private_key = jwk.construct(pem, self.algorithm)
+        except JOSEError as exc:
+            raise ValueError(f"Invalid {self.algorithm} key: {exc}") from exc
+        return private_key, private_key.public_key()
+
+    def public_jwk(self, public_key: Any) -> Dict[str, Any]:
+        return public_key.to_dict()
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        if self.signing_kid is None:
+            return jwt.encode(
+                claims, self.secret_key, algorithm=self.algorithm
+            )
+        return jwt.encode(
+            claims,
+            self.private_keys[self.signing_kid],
+            algorithm=self.algorithm,
+            headers={"kid": self.signing_kid},
+        )
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        try:
+            key = self.secret_key
+            if self.signing_kid is not None:
+                key = self.get_public_key(
+                    jwt.get_unverified_header(token).get("kid")
+                )
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[self.algorithm],
+                options={"require_exp": True},
+            )
+        except jwt.JWTError as exc:
+            raise InvalidTokenError(str(exc)) from exc
+
+
+class PyJWTBackend(JWTBackend):
+    """RS256 and EdDSA need the cryptography package"""
+
+    def __init__(self, **kwargs: Any):
+        if pyjwt is None:
+            raise ValueError("The pyjwt JWT backend needs PyJWT installed")
+        super().__init__(**kwargs)
+
+    def load_key(self, pem: str) -> Tuple[Any, Any]:
+        algorithm = pyjwt.algorithms.get_default_algorithms().get(
+            self.algorithm
+        )
+        if algorithm is None:
+            raise ValueError(
+                f"The pyjwt JWT backend needs cryptography installed for "
+                f"{self.algorithm}"
+            )
+        try:
+            private_key = algorithm.prepare_key(pem)
+            return private_key, private_key.public_key()
+        except (pyjwt.PyJWTError, ValueError, TypeError) as exc:
+            raise ValueError(f"Invalid {self.algorithm} key: {exc}") from exc
+
+    def public_jwk(self, public_key: Any) -> Dict[str, Any]:
+        algorithm = pyjwt.algorithms.get_default_algorithms()[self.algorithm]
+        return json.loads(algorithm.to_jwk(public_key))
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        if self.signing_kid is None:
+            token = pyjwt.encode(
+                claims, self.secret_key, algorithm=self.algorithm
+            )
+        else:
+            token = pyjwt.encode(
+                claims,
+                self.private_keys[self.signing_kid],
+                algorithm=self.algorithm,
+                headers={"kid": self.signing_kid},
+            )
+        # PyJWT < 2 returns bytes
+        return token.decode() if isinstance(token, bytes) else token
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        try:
+            key = self.secret_key
+            if self.signing_kid is not None:
+                key = self.get_public_key(
+                    pyjwt.get_unverified_header(token).get("kid")
+                )
+            return pyjwt.decode(
+                token,
+                key,
+                algorithms=[self.algorithm],
+                options={"require": ["exp"]},
+            )
+        except pyjwt.PyJWTError as exc:
+            raise InvalidTokenError(str(exc)) from exc
+
+
+def base64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def base64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class HS256Backend(JWTBackend):
+    """
+    Minimal HS256 implementation: the HMAC key schedule and the encoded
+    header are computed once, and only the HS256 header is accepted
+    """
+
+    header = {"alg": "HS256", "typ": "JWT"}
+
+    def __init__(self, *, secret_key: str, algorithm: str, **kwargs: Any):
+        if algorithm != "HS256":
+            raise ValueError("The hs256 JWT backend only supports HS256")
+        super().__init__(secret_key=secret_key, algorithm=algorithm)
+        self._hmac = hmac.new(secret_key.encode(), digestmod=hashlib.sha256)
+        self._encoded_header: bytes = base64url_encode(
+            json.dumps(self.header, separators=(",", ":")).encode()
+        )
+
+    def load_key(self, pem: str) -> Tuple[Any, Any]:
+        raise ValueError("The hs256 JWT backend has no asymmetric keys")
+
+    def public_jwk(self, public_key: Any) -> Dict[str, Any]:
+        raise ValueError("The hs256 JWT backend has no asymmetric keys")
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        signature = self._hmac.copy()
+        signature.update(signing_input)
+        return signature.digest()
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        signing_input = (
+            self._encoded_header
+            + b"."
+            + base64url_encode(
+                json.dumps(claims, separators=(",", ":")).encode()
+            )
+        )
+        return (
+            signing_input + b"." + base64url_encode(self._sign(signing_input))
+        ).decode()
+
+    def _verify_header(self, encoded_header: bytes) -> None:
+        if encoded_header == self._encoded_header:
+            return
+        # Same header, encoded by another library
+        header = json.loads(base64url_decode(encoded_header))
+        if not isinstance(header, dict) or header.get("alg") != "HS256":
+            raise InvalidTokenError("The token algorithm is not HS256")
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        try:
+            encoded = token.encode("ascii")
+            signing_input, _, encoded_signature = encoded.rpartition(b".")
+            encoded_header, _, encoded_claims = signing_input.partition(b".")
+            if not encoded_header or b"." in encoded_claims:
+                raise InvalidTokenError("Not enough or too many segments")
+            self._verify_header(encoded_header)
+            if not hmac.compare_digest(
+                self._sign(signing_input), base64url_decode(encoded_signature)
+            ):
+                raise InvalidTokenError("Signature verification failed")
+            claims = json.loads(base64url_decode(encoded_claims))
+        except (UnicodeError, binascii.Error, ValueError) as exc:
+            raise InvalidTokenError(str(exc)) from exc
+        if not isinstance(claims, dict):
+            raise InvalidTokenError("The claims are not a JSON object")
+        self._validate_claims(claims)
+        return claims
+
+    @staticmethod
+    def _validate_claims(claims: Dict[str, Any]) -> None:
+        now = time.time()
+        for claim in ("exp", "nbf", "iat"):
+            if claim in claims and (
+                isinstance(claims[claim], bool)
+                or not isinstance(claims[claim], (int, float))
+            ):
+                raise InvalidTokenError(f"The {claim} claim is not a number")
+        if "exp" not in claims:
+            raise InvalidTokenError("The exp claim is required")
+        if claims["exp"] <= now:
+            raise InvalidTokenError("The token has expired")
+        if claims.get("nbf", now) > now:
+            raise InvalidTokenError("The token is not yet valid")
+
+
+JWT_BACKENDS = {
+    "jose": JoseBackend,
+    "pyjwt": PyJWTBackend,
+    "hs256": HS256Backend,
+}
+
+
+def get_jwt_backend(
+    name: str,
+    *,
+    secret_key: str,
+    algorithm: str,
+    signing_keys: Optional[Dict[str, str]] = None,
+    signing_kid: Optional[str] = None,
+) -> JWTBackend:
+    if name not in JWT_BACKENDS:
+        raise ValueError(
+            f"Unknown JWT backend {name!r}, one of {', '.join(JWT_BACKENDS)}"
+        )
+    return JWT_BACKENDS[name](
+        secret_key=secret_key,
+        algorithm=algorithm,
+        signing_keys=signing_keys,
+        signing_kid=signing_kid,
+    )
+
+
+def read_signing_keys(paths: Dict[str, str]) -> Dict[str, str]:
+    """PEM private keys of the kid: PEM file path settings"""
+    return {kid: Path(path).read_text() for kid, path in paths.items()}
+
+
+jwt_backend = get_jwt_backend(
+    settings.JWT_BACKEND,
+    secret_key=settings.SECRET_KEY,
+    algorithm=ALGORITHM,
+    signing_keys=read_signing_keys(settings.JWT_SIGNING_KEYS),
+    signing_kid=settings.JWT_SIGNING_KID,
+)
 
 
 def create_access_token(
@@ -20,11 +351,23 @@ def create_access_token(
         else datetime.utcnow()
         + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    to_encode = {"exp": expire, **subject}
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=ALGORITHM
-    )
-    return encoded_jwt
+    # NumericDate, the same for every backend, and the id to revoke it
+    to_encode = {
+        "exp": calendar.timegm(expire.utctimetuple()),
+        "jti": secrets.token_urlsafe(16),
+        **subject,
+    }
+    return jwt_backend.encode(to_encode)
+
+
+def create_refresh_token() -> str:
+    """Opaque random token, only its hash is stored"""
+    return secrets.token_urlsafe(32)
+
+
+def get_refresh_token_hash(token: str) -> str:
+    # 256 random bits, a fast digest is enough (no bcrypt on refresh)
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -0,0 +1,169 @@
+import asyncio
+import functools
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+access_logger = logging.getLogger("app.access")
+
+# Debug response header with the database commands issued by the request
+DB_COMMANDS_HEADER = b"x-db-commands"
+
+
+class RequestTiming:
+    """
+    Time spent by a request in the database, the crypto pool, the endpoint
+    and the response encoding (validation and rendering), in seconds, and
+    the number of database commands it issued
+    """
+
+    __slots__ = ("start", "durations", "endpoint_end", "db_commands")
+
+    def __init__(self):
+        self.start: float = time.perf_counter()
+        self.durations: Dict[str, float] = defaultdict(float)
+        self.endpoint_end: Optional[float] = None
+        self.db_commands: int = 0
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] += seconds
+
+    def server_timing(self) -> str:
+        """Value of the Server-Timing header (durations in milliseconds)"""
+        durations = {
+            **self.durations,
+            "total": time.perf_counter() - self.start,
+        }
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.1f}"
+            for name, seconds in durations.items()
+        )
+
+
+request_timing: ContextVar[Optional[RequestTiming]] = ContextVar(
+    "request_timing", default=None
+)
+
+
+@contextmanager
+def measure(name: str) -> Iterator[None]:
+    """Add the duration of the block to the timing of the current request"""
+    timing = request_timing.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing is not None:
+            timing.add(name, time.perf_counter() - start)
+
+
+def timed_endpoint(endpoint: Callable) -> Callable:
+    """
+    Record the endpoint duration and when it returned, the time from then
+    to the response start is the encoding time
+    """
+    if getattr(endpoint, "is_timed", False):
+        # include_router builds the routes again from their endpoints
+        return endpoint
+
+    def finished(start: float) -> None:
+        timing = request_timing.get()
+        if timing is not None:
+            timing.endpoint_end = time.perf_counter()
+            timing.add("endpoint", timing.endpoint_end - start)
+
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                finished(start)
+
+        async_wrapper.is_timed = True
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            finished(start)
+
+    wrapper.is_timed = True
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware opening the timing context of each request, which
+    is emitted as the Server-Timing header and in the access log, and the
+    database commands count as the debug X-DB-Commands header
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        server_timing_header: bool = True,
+        db_commands_header: bool = False,
+    ):
+        self.app = app
+        self.server_timing_header: bool = server_timing_header
+        self.db_commands_header: bool = db_commands_header
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = request_timing.set(timing)
+        status = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timing.endpoint_end is not None:
+                    timing.add(
+                        "encode", time.perf_counter() - timing.endpoint_end
+                    )
+                headers: List[Tuple[bytes, bytes]] = list(
+                    message.get("headers", [])
+                )
+                if self.server_timing_header:
+                    headers.append(
+                        (b"server-timing", timing.server_timing().encode())
+                    )
+                if self.db_commands_header:
+                    headers.append(
+                        (DB_COMMANDS_HEADER, str(timing.db_commands).encode())
+                    )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timing.reset(token)
+            access_logger.info(
+                '"%s %s" %s %s db_commands=%s',
+                scope["method"],
+                scope["path"],
+                status,
+                timing.server_timing(),
+                timing.db_commands,
+            )
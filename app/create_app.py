@@ -1,34 +1,127 @@
-from fastapi import FastAPI
+import hashlib
+import json
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response
 
+from app import crud
+from app.api import deps
 from app.api.api_v1.api import api_router
 from app.core.config import settings
+from app.core.crypto import crypto_service
 from app.core.db import mongo_db
+from app.core.http_metrics import MetricsMiddleware, request_metrics
+from app.core.loop_monitor import loop_monitor
+from app.core.profiling import ProfilingMiddleware, profile_store
+from app.core.revocation import revocation_filter
+from app.core.security import jwt_backend
+from app.core.timing import TimingMiddleware
+from app.db.indexes import ensure_indexes
 from app.db.init_db import init_db
 
 
 def add_db(app, config_db):
     mongo_db.uri = config_db.MONGO_DATABASE_URI
     mongo_db.db_name = config_db.DB_NAME
+    mongo_db.client_options = dict(
+        maxPoolSize=config_db.MONGO_MAX_POOL_SIZE,
+        minPoolSize=config_db.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=config_db.MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=config_db.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=config_db.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        compressors=config_db.MONGO_COMPRESSORS,
+    )
 
     @app.on_event("startup")
     async def startup() -> None:
         app.state.db_instance = mongo_db.init_db()
+        await ensure_indexes()
         await init_db()  # Add initial data
 
 
+def add_crypto(app, config_crypto):
+    crypto_service.max_workers = config_crypto.CRYPTO_PROCESS_POOL_SIZE
+
+    @app.on_event("startup")
+    async def start_crypto() -> None:
+        crypto_service.start()
+
+    @app.on_event("shutdown")
+    async def shutdown_crypto() -> None:
+        crypto_service.shutdown()
+
+
+def add_revocation_filter(app):
+    revocation_filter.loader = crud.revoked_token.iter_keys
+
+    @app.on_event("startup")
+    async def start_revocation_filter() -> None:
+        # Synced before serving (after add_db), then in the background
+        await revocation_filter.sync(rebuild=True)
+        revocation_filter.start()
+
+    @app.on_event("shutdown")
+    async def shutdown_revocation_filter() -> None:
+        await revocation_filter.stop()
+
+
+def add_loop_monitor(app, config_loop_monitor):
+    if not config_loop_monitor.LOOP_MONITOR_ENABLED:
+        return
+    loop_monitor.interval = config_loop_monitor.LOOP_LAG_INTERVAL_MS / 1000
+    loop_monitor.threshold_ms = config_loop_monitor.LOOP_BLOCKED_THRESHOLD_MS
+
+    @app.on_event("startup")
+    async def start_loop_monitor() -> None:
+        loop_monitor.start()
+
+    @app.on_event("shutdown")
+    async def shutdown_loop_monitor() -> None:
+        await loop_monitor.stop()
+
+
 def ping_router(app):
     @app.get("/ping")
     def get_ping():
         return {"result": "pong"}
 
 
+def metrics_router(app):
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        return PlainTextResponse(
+            request_metrics.render(),
+            media_type="text/plain; version=0.0.4",
+        )
+
+
+def jwks_router(app):
+    # The keys only change on a restart, so the document is rendered once
+    # and cached by the consumers for JWKS_MAX_AGE_SECONDS
+    content = json.dumps(jwt_backend.jwks(), separators=(",", ":")).encode()
+    headers = {
+        "Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}",
+        "ETag": f'"{hashlib.sha256(content).hexdigest()[:32]}"',
+    }
+
+    @app.get("/.well-known/jwks.json", include_in_schema=False)
+    def get_jwks(request: Request):
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content, media_type="application/json", headers=headers
+        )
+
+
 def add_routers(app):
     ping_router(app)
+    metrics_router(app)
+    jwks_router(app)
     app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
 
-def add_middleware(app):
+def add_middleware(app, config_middleware):
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -36,6 +129,21 @@ def add_middleware(app):
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if config_middleware.PROFILING_ENABLED:
+        app.add_middleware(
+            ProfilingMiddleware,
+            authorize=deps.is_profiling_authorized,
+            store=profile_store,
+            interval=config_middleware.PROFILING_INTERVAL_MS / 1000,
+            max_seconds=config_middleware.PROFILING_MAX_SECONDS,
+        )
+    app.add_middleware(
+        TimingMiddleware,
+        server_timing_header=config_middleware.SERVER_TIMING_HEADER,
+        db_commands_header=config_middleware.DB_COMMANDS_HEADER,
+    )
+    # Added last, so it is the outermost and times the whole request
+    app.add_middleware(MetricsMiddleware)
 
 
 def create_app(settings):
@@ -45,5 +153,8 @@ def create_app(settings):
     )
     add_routers(app)
     add_db(app, settings)
-    add_middleware(app)
+    add_revocation_filter(app)
+    add_crypto(app, settings)
+    add_loop_monitor(app, settings)
+    add_middleware(app, settings)
     return app
@@ -1,4 +1,6 @@
 from .account import account
+from .refresh_token import refresh_token
+from .revoked_token import revoked_token
 from .role import role
 from .user import user
 from .user_role import user_role
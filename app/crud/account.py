@@ -1,11 +1,21 @@
+from app.api.api_v1.error_messages import account_error_messages
+from app.core.cache import clear_principals
 from app.crud.base import CRUDBase
 from app.models.account import Account
 from app.schemas.account import AccountCreate, AccountUpdate
 
 
 class CRUDAccount(CRUDBase[Account, AccountCreate, AccountUpdate]):
+    conflict_detail = account_error_messages[
+        "account_with_name_already_exists"
+    ]
+
     def __init__(self):
         self.model = Account
 
+    async def _invalidate_principal_cache(self, *, db_obj: Account) -> None:
+        # The cached principals embed the account (name and is_active)
+        clear_principals()
+
 
 account = CRUDAccount()
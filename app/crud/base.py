@@ -1,9 +1,32 @@
-from typing import Any, Dict, Generic, List, Optional, TypeVar, Union
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
 
 from bson import ObjectId
+from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
+from marshmallow import ValidationError
 from pydantic import BaseModel
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from starlette import status
 
+from app.core.cache import invalidate_principal
+from app.core.config import settings
+from app.core.metrics import track_db_operation
+from app.crud.pagination import (
+    encode_cursor,
+    get_keyset_filter,
+    get_keyset_sort,
+)
 from app.models.base import Base
 
 # Define custom types for umongo model, and Pydantic schemas
@@ -13,64 +36,179 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # Indexed sort key of the listings, the ties are broken by _id
+    sort_field: str = "name"
+    # Detail (formatted with the created data) of the 409 response raised
+    # when a create violates a unique index
+    conflict_detail: Optional[str] = None
+
+    async def _invalidate_principal_cache(self, *, db_obj: ModelType) -> None:
+        invalidate_principal(str(db_obj.id))
+
+    async def _find_page(
+        self,
+        *,
+        _filter: Dict,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> List[ModelType]:
+        """
+        Page of documents, after the keyset cursor when given (skip is
+        ignored) or else after skipping skip documents
+        """
+        if cursor:
+            _filter = {
+                **_filter,
+                **get_keyset_filter(sort_field=self.sort_field, cursor=cursor),
+            }
+            skip = 0
+        documents = (
+            self.model.find(_filter)
+            .sort(get_keyset_sort(self.sort_field))
+            .skip(skip)
+            .limit(min(limit, settings.MAX_PAGE_SIZE))
+        )
+        return [document async for document in documents]
+
+    def get_next_cursor(
+        self, *, objects: List[ModelType], limit: int
+    ) -> Optional[str]:
+        if not objects or len(objects) < min(limit, settings.MAX_PAGE_SIZE):
+            return None
+        last_object = objects[-1]
+        return encode_cursor(
+            value=getattr(last_object, self.sort_field), _id=last_object.id
+        )
+
+    @track_db_operation
     async def get_multi(
-        self, *, skip: int = 0, limit: int = 100
+        self,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
     ) -> List[ModelType]:
-        objects = []
-        cursor = (
+        return await self._find_page(
+            _filter={"is_active": True},
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+        )
+
+    @track_db_operation
+    async def iter_multi(
+        self, *, batch_size: int = settings.EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[ModelType]:
+        """
+        Iterate all the active documents in the listing order, fetching
+        them from the server in batches of batch_size documents
+        """
+        documents = (
             self.model.find({"is_active": True})
-            .sort("name", -1)
-            .skip(skip)
-            .limit(limit)
+            .sort(get_keyset_sort(self.sort_field))
+            .batch_size(batch_size)
         )
-        async for document in cursor:
-            objects.append(document)
-        return objects
+        async for document in documents:
+            yield document
 
+    @track_db_operation
     async def get(self, *, _id: str) -> Optional[ModelType]:
         return await self.model.find_one(
             {"_id": ObjectId(_id), "is_active": True}
         )
 
+    @track_db_operation
     async def get_not_active(self, *, _id: str) -> Optional[ModelType]:
         return await self.model.find_one(
             {"_id": ObjectId(_id), "is_active": False}
         )
 
+    @track_db_operation
     async def get_by_name(self, *, name: str) -> Optional[ModelType]:
         return await self.model.find_one({"name": name, "is_active": True})
 
+    @track_db_operation
     async def create(self, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
-        await db_obj.commit()
+        # Surface the schema errors before the write, so the ones raised by
+        # commit are the unique index violations (umongo converts them)
+        db_obj.required_validate()
+        try:
+            await db_obj.commit()
+        except (DuplicateKeyError, ValidationError):
+            if self.conflict_detail is None:
+                raise
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=self.conflict_detail.format(**obj_in_data),
+            )
         assert db_obj.is_created
         return db_obj
 
+    async def _find_one_and_update(
+        self, *, _id: str, update_data: Dict[str, Any]
+    ) -> Optional[ModelType]:
+        """
+        Validate and apply the update of an active document in a single
+        round trip, returning the updated document (or None if not exists)
+        """
+        update_document = self.model.build_from_mongo({})
+        update_document.update(update_data)
+        update = update_document.to_mongo(update=True) or {}
+        update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+        try:
+            document = await self.model.collection.find_one_and_update(
+                {"_id": ObjectId(_id), "is_active": True},
+                update,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            if self.conflict_detail is None:
+                raise
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=self.conflict_detail.format(
+                    **jsonable_encoder(update_data)
+                ),
+            )
+        if not document:
+            return None
+        db_obj = self.model.build_from_mongo(document)
+        await self._invalidate_principal_cache(db_obj=db_obj)
+        return db_obj
+
+    @track_db_operation
     async def _update(
         self,
         *,
         _id: str,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]],
-    ) -> ModelType:
+    ) -> Optional[ModelType]:
         update_data = (
             obj_in
             if isinstance(obj_in, dict)
             else obj_in.dict(exclude_unset=True)
         )
-        obj_to_update = await self.get(_id=_id)
-        obj_to_update.update(update_data)
-        await obj_to_update.commit()
-        return obj_to_update
+        return await self._find_one_and_update(
+            _id=_id, update_data=update_data
+        )
 
+    @track_db_operation
     async def _remove(self, *, _id: str) -> int:
-        find_object = await self.get(_id=_id)
-        object_deleted = await find_object.delete()
-        return object_deleted.deleted_count
+        document = await self.model.collection.find_one_and_delete(
+            {"_id": ObjectId(_id), "is_active": True}
+        )
+        if not document:
+            return 0
+        db_obj = self.model.build_from_mongo(document)
+        await self._invalidate_principal_cache(db_obj=db_obj)
+        return 1
 
-    async def partial_remove(self, *, _id: str) -> ModelType:
+    @track_db_operation
+    async def partial_remove(self, *, _id: str) -> Optional[ModelType]:
         update_status = {"is_active": False}
-        obj_to_update = await self.get(_id=_id)
-        obj_to_update.update(update_status)
-        await obj_to_update.commit()
-        return obj_to_update
+        return await self._find_one_and_update(
+            _id=_id, update_data=update_status
+        )
@@ -0,0 +1,57 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING
+
+
+def encode_cursor(*, value: Any, _id: ObjectId) -> str:
+    """
+    Opaque cursor pointing after the (value, _id) sort key of a document
+    """
+    if isinstance(value, datetime):
+        data = {"t": "datetime", "v": value.isoformat()}
+    else:
+        data = {"t": "value", "v": value}
+    data["id"] = str(_id)
+    encoded = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(encoded).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = (
+            datetime.fromisoformat(data["v"])
+            if data["t"] == "datetime"
+            else data["v"]
+        )
+        return value, ObjectId(data["id"])
+    except (
+        binascii.Error,
+        InvalidId,
+        KeyError,
+        TypeError,
+        ValueError,
+    ):
+        raise ValueError("Not a valid cursor")
+
+
+def get_keyset_sort(sort_field: str):
+    return [(sort_field, DESCENDING), ("_id", DESCENDING)]
+
+
+def get_keyset_filter(*, sort_field: str, cursor: str) -> Dict:
+    """
+    Documents after the cursor in the descending (sort_field, _id) order
+    """
+    value, _id = decode_cursor(cursor)
+    return {
+        # Bound the index scan, the $or only breaks the ties on _id
+        sort_field: {"$lte": value},
+        "$or": [{sort_field: {"$lt": value}}, {"_id": {"$lt": _id}}],
+    }
@@ -0,0 +1,103 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.core.metrics import track_db_operation
+from app.core.security import create_refresh_token, get_refresh_token_hash
+from app.crud.base import CRUDBase
+from app.models.refresh_token import RefreshToken
+from app.schemas.refresh_token import RefreshTokenCreate
+
+logger = logging.getLogger(__name__)
+
+
+class CRUDRefreshToken(
+    CRUDBase[RefreshToken, RefreshTokenCreate, RefreshTokenCreate]
+):
+    sort_field = "created_at"
+
+    def __init__(self):
+        self.model = RefreshToken
+
+    @track_db_operation
+    async def issue(
+        self,
+        *,
+        user_id: ObjectId,
+        claims: Dict[str, Any],
+        family_id: Optional[ObjectId] = None,
+    ) -> Tuple[str, RefreshToken]:
+        """
+        Store a new refresh token of the family (a new one on login), and
+        return it with its document
+        """
+        token = create_refresh_token()
+        db_obj = await self.create(
+            obj_in=RefreshTokenCreate(
+                token_hash=get_refresh_token_hash(token),
+                user_id=str(user_id),
+                family_id=str(family_id or ObjectId()),
+                claims=claims,
+                expires_at=datetime.utcnow()
+                + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+            )
+        )
+        return token, db_obj
+
+    @track_db_operation
+    async def rotate(self, *, token: str) -> Optional[RefreshToken]:
+        """
+        Consume an active refresh token in a single indexed round trip and
+        return it, so it can be exchanged once only. A consumed token being
+        presented again (stolen, or replayed) revokes its whole family
+        """
+        token_hash = get_refresh_token_hash(token)
+        now = datetime.utcnow()
+        document = await self.model.collection.find_one_and_update(
+            {
+                "token_hash": token_hash,
+                "is_active": True,
+                "expires_at": {"$gt": now},
+            },
+            {"$set": {"is_active": False, "updated_at": now}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if document:
+            return self.model.build_from_mongo(document)
+        reused = await self.model.collection.find_one(
+            {"token_hash": token_hash, "is_active": False},
+            projection={"family_id": 1, "user_id": 1},
+        )
+        if reused:
+            logger.warning(
+                "Reused refresh token of the user %s, revoking its family",
+                reused["user_id"],
+            )
+            await self.revoke_family(family_id=reused["family_id"])
+        return None
+
+    @track_db_operation
+    async def revoke(self, *, token: str, user_id: ObjectId) -> int:
+        """Revoke the family of a refresh token of the user (logout)"""
+        document = await self.model.collection.find_one(
+            {"token_hash": get_refresh_token_hash(token), "user_id": user_id},
+            projection={"family_id": 1},
+        )
+        if not document:
+            return 0
+        return await self.revoke_family(family_id=document["family_id"])
+
+    @track_db_operation
+    async def revoke_family(self, *, family_id: ObjectId) -> int:
+        result = await self.model.collection.update_many(
+            {"family_id": family_id, "is_active": True},
+            {"$set": {"is_active": False, "updated_at": datetime.utcnow()}},
+        )
+        return result.modified_count
+
+
+refresh_token = CRUDRefreshToken()
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+
+from bson import ObjectId
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.metrics import track_db_operation
+from app.core.revocation import revocation_filter
+from app.crud.base import CRUDBase
+from app.models.revoked_token import RevokedToken
+
+
+def get_jti_key(jti: str) -> str:
+    return f"jti:{jti}"
+
+
+def get_user_version_key(user_id: ObjectId, token_version: int) -> str:
+    return f"user:{user_id}:{token_version}"
+
+
+class CRUDRevokedToken(CRUDBase[RevokedToken, BaseModel, BaseModel]):
+    sort_field = "created_at"
+
+    def __init__(self):
+        self.model = RevokedToken
+
+    @track_db_operation
+    async def revoke(self, *, key: str, expires_at: datetime) -> None:
+        """
+        Revoke the tokens of the key until expires_at (when they expire)
+        """
+        now = datetime.utcnow()
+        await self.model.collection.update_one(
+            {"key": key},
+            {
+                "$setOnInsert": {
+                    "is_active": True,
+                    "created_at": now,
+                    "updated_at": now,
+                },
+                "$max": {"expires_at": expires_at},
+            },
+            upsert=True,
+        )
+        revocation_filter.add(key)
+
+    async def revoke_user_version(
+        self, *, user_id: ObjectId, token_version: int
+    ) -> None:
+        """Revoke the tokens issued to the user with token_version"""
+        await self.revoke(
+            key=get_user_version_key(user_id, token_version),
+            expires_at=datetime.utcnow()
+            + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        )
+
+    @track_db_operation
+    async def is_revoked(self, *, keys: List[str]) -> bool:
+        """
+        Whether any of the keys is revoked, querying the database only for
+        the positives of the revocation filter
+        """
+        positives = [key for key in keys if key in revocation_filter]
+        if not positives:
+            return False
+        revocation_filter.positives += 1
+        revoked = await self.model.collection.find_one(
+            {
+                "key": {"$in": positives},
+                "expires_at": {"$gt": datetime.utcnow()},
+            },
+            projection={"_id": 1},
+        )
+        if not revoked:
+            revocation_filter.false_positives += 1
+        return revoked is not None
+
+    async def iter_keys(
+        self, since: Optional[datetime] = None
+    ) -> AsyncIterator[str]:
+        """Keys revoked since the date (all of them without date)"""
+        _filter = {"expires_at": {"$gt": datetime.utcnow()}}
+        if since is not None:
+            _filter["created_at"] = {"$gte": since}
+        documents = self.model.collection.find(
+            _filter, projection={"key": 1, "_id": 0}
+        ).batch_size(settings.EXPORT_BATCH_SIZE)
+        async for document in documents:
+            yield document["key"]
+
+
+revoked_token = CRUDRevokedToken()
@@ -1,3 +1,4 @@
+from app.core.cache import clear_principals
 from app.crud.base import CRUDBase
 from app.models.role import Role
 from app.schemas.role import RoleCreate, RoleUpdate
@@ -7,5 +8,9 @@ class CRUDRole(CRUDBase[Role, RoleCreate, RoleUpdate]):
     def __init__(self):
         self.model = Role
 
+    async def _invalidate_principal_cache(self, *, db_obj: Role) -> None:
+        # The cached principals embed the role name
+        clear_principals()
+
 
 role = CRUDRole()
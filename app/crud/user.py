@@ -1,45 +1,135 @@
-from typing import Any, Dict, List, Optional, Union
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from marshmallow import ValidationError
+from pymongo.errors import BulkWriteError
 
-from app.core.security import get_password_hash, verify_password
+from app.api.api_v1.error_messages import users_error_messages
+from app.core.config import settings
+from app.core.crypto import crypto_service
+from app.core.metrics import track_db_operation
 from app.crud.base import CRUDBase
+from app.crud.revoked_token import revoked_token
 from app.models.user import User
 from app.schemas.user import UserCreate, UserInDB, UserUpdate
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    sort_field = "created_at"
+    conflict_detail = users_error_messages["user_with_email_already_exists"]
+
     def __init__(self):
         self.model = User
 
     async def get_by_email(self, *, email: str) -> Optional[User]:
         email_filter = {"email": email, "is_active": True}
-        user_with_account_and_role = await self._get_with_account_and_role(
-            _filter=email_filter
-        )
-        if not user_with_account_and_role:
-            guest_user = await self.model.find_one(email_filter)
-            return guest_user
-
-        return user_with_account_and_role
+        return await self._get_with_account_and_role(_filter=email_filter)
 
+    @track_db_operation
     async def create(self, *, obj_in: UserCreate) -> User:
         create_data = obj_in.dict(exclude_unset=True)
-        create_data["hashed_password"] = get_password_hash(
-            create_data["password"]
-        )
+        create_data[
+            "hashed_password"
+        ] = await crypto_service.get_password_hash(create_data["password"])
         del create_data["password"]
         return await super().create(obj_in=create_data)
 
+    @track_db_operation
+    async def create_many(
+        self,
+        *,
+        objs_in: List[UserCreate],
+        chunk_size: int = settings.BULK_INSERT_CHUNK_SIZE,
+    ) -> List[Tuple[ObjectId, Optional[Dict]]]:
+        """
+        Create the users in unordered insert_many chunks, hashing the
+        passwords of each chunk concurrently in the crypto process pool.
+        Return, for each input, its id and the write error (if any). The
+        inputs invalid for the model are not hashed nor inserted, their
+        error has a None code
+        """
+        results = []
+        for start in range(0, len(objs_in), chunk_size):
+            end = start + chunk_size
+            chunk = objs_in[start:end]
+            now = datetime.utcnow()
+            db_objs, invalid = [], {}
+            for index, obj_in in enumerate(chunk):
+                create_data = jsonable_encoder(
+                    obj_in.dict(exclude_unset=True, exclude={"password"})
+                )
+                try:
+                    db_objs.append(
+                        (
+                            index,
+                            obj_in,
+                            self.model(
+                                **create_data, created_at=now, updated_at=now
+                            ),
+                        )
+                    )
+                except ValidationError as exc:
+                    invalid[index] = {
+                        "code": None,
+                        "errmsg": "; ".join(
+                            f"{field}: {' '.join(messages)}"
+                            for field, messages in exc.messages.items()
+                        ),
+                    }
+            hashed_passwords = await asyncio.gather(
+                *(
+                    crypto_service.get_password_hash(obj_in.password)
+                    for _, obj_in, _ in db_objs
+                )
+            )
+            documents = []
+            for (_, _, db_obj), hashed_password in zip(
+                db_objs, hashed_passwords
+            ):
+                db_obj.hashed_password = hashed_password
+                db_obj.required_validate()
+                document = db_obj.to_mongo()
+                document["_id"] = ObjectId()
+                documents.append(document)
+            write_errors = {}
+            if documents:
+                try:
+                    await self.model.collection.insert_many(
+                        documents, ordered=False
+                    )
+                except BulkWriteError as exc:
+                    write_errors = {
+                        error["index"]: error
+                        for error in exc.details["writeErrors"]
+                    }
+            chunk_results = [
+                (None, invalid.get(index)) for index in range(len(chunk))
+            ]
+            for document_index, ((index, _, _), document) in enumerate(
+                zip(db_objs, documents)
+            ):
+                chunk_results[index] = (
+                    document["_id"],
+                    write_errors.get(document_index),
+                )
+            results.extend(chunk_results)
+        return results
+
+    @track_db_operation
     async def _update(
         self,
         *,
         _id: str,
         obj_in: Union[UserUpdate, Dict[str, Any]],
-    ) -> User:
+    ) -> Optional[User]:
         update_data = obj_in.dict(exclude_unset=True)
         if "password" in update_data:
-            hashed_password = get_password_hash(update_data["password"])
+            hashed_password = await crypto_service.get_password_hash(
+                update_data["password"]
+            )
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
         return await super()._update(_id=_id, obj_in=update_data)
@@ -50,36 +140,86 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         user = await self.get_by_email(email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await crypto_service.verify_password(
+            password, user.hashed_password
+        ):
             return None
         return user
 
+    @track_db_operation
+    async def get_principal_claims(self, *, _id: str) -> Optional[Dict]:
+        """
+        Return the current token version and account of an active user
+        """
+        return await self.model.collection.find_one(
+            {"_id": ObjectId(_id), "is_active": True},
+            projection={"token_version": 1, "account_id": 1},
+        )
+
+    @track_db_operation
+    async def increment_token_version(self, *, _id: str) -> None:
+        document = await self.model.collection.find_one_and_update(
+            {"_id": ObjectId(_id)},
+            {
+                "$inc": {"token_version": 1},
+                "$set": {"updated_at": datetime.utcnow()},
+            },
+            projection={"token_version": 1},
+        )
+        if document:
+            # Revoked in the other workers too, before their caches expire
+            await revoked_token.revoke_user_version(
+                user_id=document["_id"],
+                token_version=document.get("token_version", 0),
+            )
+
+    @track_db_operation
+    async def partial_remove(self, *, _id: str) -> Optional[User]:
+        db_obj = await super().partial_remove(_id=_id)
+        if db_obj:
+            await revoked_token.revoke_user_version(
+                user_id=db_obj.id, token_version=db_obj.token_version
+            )
+        return db_obj
+
+    @track_db_operation
     async def get_by_account_id(
         self,
         *,
         account_id: ObjectId,
         skip: int = 0,
         limit: int = 100,
+        cursor: Optional[str] = None,
     ) -> List[User]:
-        users_found = (
-            self.model.find({"account_id": account_id, "is_active": True})
-            .sort("name", -1)
-            .skip(skip)
-            .limit(limit)
+        return await self._find_page(
+            _filter={"account_id": account_id, "is_active": True},
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
         )
-        response = [user_found async for user_found in users_found]
-        return response
 
+    @track_db_operation
     async def _get_with_account_and_role(
         self, *, _filter: Dict
-    ) -> Optional[User]:
+    ) -> Optional[Union[User, UserInDB]]:
+        """
+        Resolve HOST users (with account and role) as UserInDB and GUEST
+        users as User, both in a single round trip
+        """
         _match = {"$match": _filter}
-        user_with_role_and_account = {}
+        user_found = None
         async for user_found in self.model.get_with_account_and_role(
             _match=_match
         ):
-            user_with_role_and_account = UserInDB(**user_found)
-        return user_with_role_and_account
+            pass
+        if not user_found:
+            return None
+        if user_found.get("account") and user_found.get("role"):
+            return UserInDB(**user_found)
+        # GUEST user
+        user_found.pop("account", None)
+        user_found.pop("role", None)
+        return self.model.build_from_mongo(user_found)
 
 
 user = CRUDUser()
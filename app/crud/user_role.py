@@ -1,16 +1,66 @@
-from typing import Optional
+from typing import Any, Dict, Optional, Union
 
 from bson.objectid import ObjectId
 
+from app.core.cache import invalidate_principal
+from app.core.metrics import track_db_operation
 from app.crud.base import CRUDBase
+from app.crud.user import user as crud_user
 from app.models.user_role import UserRole
 from app.schemas.user_role import UserRoleCreate, UserRoleUpdate
 
 
 class CRUDUserRole(CRUDBase[UserRole, UserRoleCreate, UserRoleUpdate]):
+    sort_field = "created_at"
+
     def __init__(self):
         self.model = UserRole
 
+    async def _invalidate_principal_cache(self, *, db_obj: UserRole) -> None:
+        invalidate_principal(str(db_obj.user_id))
+
+    async def _revoke_tokens(self, *, user_id: ObjectId) -> None:
+        # A role change revokes the tokens issued with the previous role
+        await crud_user.increment_token_version(_id=user_id)
+        invalidate_principal(str(user_id))
+
+    @track_db_operation
+    async def create(self, *, obj_in: UserRoleCreate) -> UserRole:
+        user_role = await super().create(obj_in=obj_in)
+        await self._revoke_tokens(user_id=user_role.user_id)
+        return user_role
+
+    @track_db_operation
+    async def _update(
+        self,
+        *,
+        _id: str,
+        obj_in: Union[UserRoleUpdate, Dict[str, Any]],
+    ) -> Optional[UserRole]:
+        user_role = await super()._update(_id=_id, obj_in=obj_in)
+        if user_role:
+            await self._revoke_tokens(user_id=user_role.user_id)
+        return user_role
+
+    @track_db_operation
+    async def _remove(self, *, _id: str) -> int:
+        document = await self.model.collection.find_one_and_delete(
+            {"_id": ObjectId(_id), "is_active": True},
+            projection={"user_id": 1},
+        )
+        if not document:
+            return 0
+        await self._revoke_tokens(user_id=document["user_id"])
+        return 1
+
+    @track_db_operation
+    async def partial_remove(self, *, _id: str) -> Optional[UserRole]:
+        user_role = await super().partial_remove(_id=_id)
+        if user_role:
+            await self._revoke_tokens(user_id=user_role.user_id)
+        return user_role
+
+    @track_db_operation
     async def get_by_user_id(self, *, user_id: str) -> Optional[UserRole]:
         return await self.model.find_one(
             {"user_id": ObjectId(user_id), "is_active": True}
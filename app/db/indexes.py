@@ -0,0 +1,77 @@
+"""
+Indexes declared in the ``Meta.indexes`` of the umongo models.
+
+Report the missing, unused and undeclared indexes of the database:
+
+    python -m app.db.indexes
+
+Create the missing ones:
+
+    python -m app.db.indexes --ensure
+"""
+import argparse
+import asyncio
+import json
+from typing import Dict, List
+
+from app.core.config import settings
+from app.core.db import mongo_db
+from app.models import (
+    Account,
+    RefreshToken,
+    RevokedToken,
+    Role,
+    User,
+    UserRole,
+)
+
+MODELS = [Account, Role, User, UserRole, RefreshToken, RevokedToken]
+
+
+async def ensure_indexes() -> None:
+    for model in MODELS:
+        await model.ensure_indexes()
+
+
+async def get_indexes_report() -> Dict[str, Dict[str, List[str]]]:
+    """
+    Compare, for each collection, the declared indexes with the ones in
+    the database. An index is unused when it has no accesses since the last
+    restart of the mongod (see $indexStats).
+    """
+    report = {}
+    for model in MODELS:
+        declared = {index.document["name"] for index in model.indexes}
+        existing = set(await model.collection.index_information())
+        existing.discard("_id_")
+        accesses = {}
+        async for index_stats in model.collection.aggregate(
+            [{"$indexStats": {}}]
+        ):
+            accesses[index_stats["name"]] = index_stats["accesses"]["ops"]
+        report[model.collection.name] = {
+            "missing": sorted(declared - existing),
+            "unused": sorted(
+                name for name in existing if not accesses.get(name)
+            ),
+            "undeclared": sorted(existing - declared),
+        }
+    return report
+
+
+async def main(*, ensure: bool) -> None:
+    mongo_db.uri = settings.MONGO_DATABASE_URI
+    mongo_db.db_name = settings.DB_NAME
+    mongo_db.init_db()
+    if ensure:
+        await ensure_indexes()
+    print(json.dumps(await get_indexes_report(), indent=4))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--ensure", action="store_true", help="create the missing indexes"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(ensure=args.ensure))
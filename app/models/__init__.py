@@ -1,4 +1,6 @@
 from .account import Account
+from .refresh_token import RefreshToken
+from .revoked_token import RevokedToken
 from .role import Role
 from .user import User
 from .user_role import UserRole
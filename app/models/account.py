@@ -1,3 +1,4 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from umongo import fields, validate
 
 from app.core.db import mongo_db
@@ -15,3 +16,16 @@ class Account(Base):
 
     class Meta:
         collection_name = "accounts"
+        indexes = [
+            # get_multi (sorted by name and _id) and get_by_name
+            IndexModel(
+                [("name", DESCENDING), ("_id", DESCENDING)],
+                partialFilterExpression={"is_active": True},
+            ),
+            # The name of the active accounts is unique (see crud.create)
+            IndexModel(
+                [("name", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"is_active": True},
+            ),
+        ]
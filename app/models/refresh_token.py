@@ -0,0 +1,27 @@
+from pymongo import ASCENDING, IndexModel
+from umongo import fields
+
+from app.core.db import mongo_db
+from app.models.base import Base
+
+
+@mongo_db.db.register
+class RefreshToken(Base):
+    # SHA-256 of the token, the token itself is never stored
+    token_hash = fields.StringField(unique=True, required=True)
+    user_id = fields.ObjectIdField(required=True)
+    # The tokens rotated from the same login, revoked together on reuse
+    family_id = fields.ObjectIdField(required=True)
+    # Claims of the access tokens issued on refresh
+    claims = fields.DictField(required=True)
+    expires_at = fields.DateTimeField(required=True)
+
+    class Meta:
+        collection_name = "refresh_tokens"
+        indexes = [
+            # Removed by the TTL monitor once expired (the rotated ones are
+            # kept until then, to detect their reuse)
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+            # revoke_family
+            IndexModel([("family_id", ASCENDING), ("is_active", ASCENDING)]),
+        ]
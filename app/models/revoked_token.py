@@ -0,0 +1,22 @@
+from pymongo import ASCENDING, IndexModel
+from umongo import fields
+
+from app.core.db import mongo_db
+from app.models.base import Base
+
+
+@mongo_db.db.register
+class RevokedToken(Base):
+    # jti of a token, or user id and token version of all the user tokens
+    # (see crud.revoked_token)
+    key = fields.StringField(unique=True, required=True)
+    expires_at = fields.DateTimeField(required=True)
+
+    class Meta:
+        collection_name = "revoked_tokens"
+        indexes = [
+            # Removed by the TTL monitor once the revoked tokens expired
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+            # Incremental sync of the revocation filters
+            IndexModel([("created_at", ASCENDING)]),
+        ]
@@ -1,3 +1,4 @@
+from pymongo import DESCENDING, IndexModel
 from umongo import fields, validate
 
 from app.core.db import mongo_db
@@ -13,3 +14,10 @@ class Role(Base):
 
     class Meta:
         collection_name = "roles"
+        indexes = [
+            # get_multi (sorted by name and _id) and get_by_name
+            IndexModel(
+                [("name", DESCENDING), ("_id", DESCENDING)],
+                partialFilterExpression={"is_active": True},
+            ),
+        ]
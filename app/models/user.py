@@ -1,5 +1,6 @@
 from typing import Dict, List
 
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from umongo import fields, validate
 
 from app.core.db import mongo_db
@@ -23,9 +24,27 @@ class User(Base):
     account_id = fields.ObjectIdField(
         default=None, allow_none=True, required=False
     )
+    # Incremented to revoke the issued tokens (e.g. on role changes)
+    token_version = fields.IntegerField(default=0)
 
     class Meta:
         collection_name = "users"
+        indexes = [
+            # get_multi (sorted by created_at and _id)
+            IndexModel(
+                [("created_at", DESCENDING), ("_id", DESCENDING)],
+                partialFilterExpression={"is_active": True},
+            ),
+            # get_by_account_id (sorted by created_at and _id)
+            IndexModel(
+                [
+                    ("account_id", ASCENDING),
+                    ("created_at", DESCENDING),
+                    ("_id", DESCENDING),
+                ],
+                partialFilterExpression={"is_active": True},
+            ),
+        ]
 
     @classmethod
     def get_with_account_and_role(cls, *, _match: Dict) -> List[Dict]:
@@ -38,12 +57,18 @@ class User(Base):
                     "localField": "account_id",
                     "foreignField": "_id",
                     "pipeline": [
-                        {"$project": {"name": 1}},
+                        {"$project": {"name": 1, "is_active": 1}},
                     ],
                     "as": "account",
                 }
             },
-            {"$unwind": "$account"},
+            # keep GUEST users (without account) in the same round trip
+            {
+                "$unwind": {
+                    "path": "$account",
+                    "preserveNullAndEmptyArrays": True,
+                }
+            },
             # join with user_roles collection
             {
                 "$lookup": {
@@ -56,7 +81,12 @@ class User(Base):
                     "as": "user_role",
                 }
             },
-            {"$unwind": "$user_role"},
+            {
+                "$unwind": {
+                    "path": "$user_role",
+                    "preserveNullAndEmptyArrays": True,
+                }
+            },
             # join with roles collection
             {
                 "$lookup": {
@@ -69,7 +99,12 @@ class User(Base):
                     "as": "role",
                 }
             },
-            {"$unwind": "$role"},
+            {
+                "$unwind": {
+                    "path": "$role",
+                    "preserveNullAndEmptyArrays": True,
+                }
+            },
             {"$project": {"user_role": 0}},
         ]
         return cls.collection.aggregate(pipeline)
@@ -1,3 +1,4 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from umongo import fields
 
 from app.core.db import mongo_db
@@ -11,3 +12,12 @@ class UserRole(Base):
 
     class Meta:
         collection_name = "user_roles"
+        indexes = [
+            # $lookup from users (user_id prefix) and get_by_user_id
+            IndexModel([("user_id", ASCENDING), ("is_active", ASCENDING)]),
+            # get_multi (sorted by created_at and _id)
+            IndexModel(
+                [("created_at", DESCENDING), ("_id", DESCENDING)],
+                partialFilterExpression={"is_active": True},
+            ),
+        ]
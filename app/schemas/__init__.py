@@ -1,5 +1,6 @@
 from .account import Account, AccountCreate, AccountInDB, AccountUpdate
+from .refresh_token import RefreshTokenCreate
 from .role import Role, RoleCreate, RoleInDB, RoleUpdate
-from .token import Token, TokenPayload
-from .user import User, UserCreate, UserInDB, UserUpdate
+from .token import Principal, Token, TokenPayload
+from .user import User, UserBulkResult, UserCreate, UserInDB, UserUpdate
 from .user_role import UserRole, UserRoleCreate, UserRoleInDB, UserRoleUpdate
@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Any, Dict, Union
+
+from pydantic import BaseModel
+
+from app.schemas.validators import ObjectId
+
+
+# Properties to store on creation
+class RefreshTokenCreate(BaseModel):
+    token_hash: str
+    user_id: Union[str, ObjectId]
+    family_id: Union[str, ObjectId]
+    claims: Dict[str, Any]
+    expires_at: datetime
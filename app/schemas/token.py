@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 from app.schemas.validators import ObjectId
@@ -6,9 +8,21 @@ from app.schemas.validators import ObjectId
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
 
 class TokenPayload(BaseModel):
     id: ObjectId
     role: str = None
     account_id: ObjectId = None
+    ver: int = 0
+    jti: Optional[str] = None
+    exp: Optional[int] = None
+
+
+# Principal authorized from the token claims, without loading the user
+class Principal(BaseModel):
+    id: ObjectId
+    role: Optional[str]
+    account_id: Optional[ObjectId]
+    token_version: int = 0
@@ -71,5 +71,16 @@ class User(UserInDBBase):
 class UserInDB(UserInDBBase):
     id: ObjectId = Field(alias="_id")
     hashed_password: str
+    token_version: int = 0
     account: Optional[Dict]
     role: Optional[Dict]
+
+
+# Result of each input row of a bulk creation
+class UserBulkResult(BaseModel):
+    index: int
+    id: Optional[ObjectId]
+    error: Optional[str]
+
+    class Config:
+        json_encoders = {ObjectId: str}
@@ -0,0 +1,151 @@
+"""
+Compare, over HTTP, the throughput (users per second) of creating --users
+users with as many ``POST /users`` calls (--concurrency clients) and with a
+single ``POST /users/bulk`` request, and report the speedup.
+
+Both endpoints hash every password with bcrypt in the crypto process pool
+(CRYPTO_PROCESS_POOL_SIZE workers), so the throughput of both is bounded by
+workers / bcrypt time, which is printed too: the bulk endpoint saves the
+per request authentication, get_by_email and insert round trips, and its
+speedup is capped by how far the per user calls are from that bound.
+
+The app is started with uvicorn on a dedicated database of the local
+mongod, dropped before each strategy (or --url targets a running server,
+then the emails are unique per run):
+
+    python -m benchmarks.bench_bulk_import --users 2000 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import httpx
+
+from app.core.config import settings
+from app.core.db import mongo_db
+from app.core.security import get_password_hash
+from benchmarks.load_test import PASSWORD, bearer, free_port, start_server
+
+
+def build_users(*, users: int, prefix: str) -> List[Dict]:
+    return [
+        {
+            "email": f"{prefix}-{i}@bench.io",
+            "password": PASSWORD,
+            "full_name": f"user {i}",
+            "phone_number": "3101234567",
+        }
+        for i in range(users)
+    ]
+
+
+async def one_by_one(
+    client: httpx.AsyncClient, headers: Dict, users: List[Dict], args
+) -> int:
+    queue = list(reversed(users))
+    created = 0
+
+    async def worker() -> None:
+        nonlocal created
+        while queue:
+            r = await client.post(
+                f"{settings.API_V1_PREFIX}/users",
+                json=queue.pop(),
+                headers=headers,
+            )
+            created += r.status_code < 300
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return created
+
+
+async def bulk(
+    client: httpx.AsyncClient, headers: Dict, users: List[Dict], args
+) -> int:
+    created = 0
+    for start in range(0, len(users), settings.BULK_MAX_ROWS):
+        end = start + settings.BULK_MAX_ROWS
+        batch = users[start:end]
+        r = await client.post(
+            f"{settings.API_V1_PREFIX}/users/bulk",
+            content="".join(json.dumps(user) + "\n" for user in batch),
+            headers={**headers, "Content-Type": "application/x-ndjson"},
+            timeout=None,
+        )
+        r.raise_for_status()
+        created += sum(1 for result in r.json() if result["id"])
+    return created
+
+
+async def measure(name: str, strategy, args) -> float:
+    server = None
+    if not args.target:
+        # Restarted on a dropped database
+        server = await start_server(args)
+    try:
+        throughput = await run_strategy(name, strategy, args)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    return throughput
+
+
+async def run_strategy(name: str, strategy, args) -> float:
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        headers = await bearer(
+            client,
+            settings.FIRST_SUPER_ADMIN_EMAIL,
+            settings.FIRST_SUPER_ADMIN_PASSWORD,
+        )
+        users = build_users(
+            users=args.users, prefix=f"{name.replace(' ', '-')}-{time.time()}"
+        )
+        start = time.perf_counter()
+        created = await strategy(client, headers, users, args)
+        elapsed = time.perf_counter() - start
+    throughput = created / elapsed
+    print(
+        f"{name:<12} users={created} elapsed={elapsed:.2f}s "
+        f"throughput={throughput:.1f} users/s"
+    )
+    return throughput
+
+
+async def main(args) -> None:
+    start = time.perf_counter()
+    get_password_hash(PASSWORD)
+    bcrypt_seconds = time.perf_counter() - start
+    print(
+        f"bcrypt={bcrypt_seconds * 1000:.0f}ms per hash, bound="
+        f"{settings.CRYPTO_PROCESS_POOL_SIZE / bcrypt_seconds:.1f} users/s "
+        f"with {settings.CRYPTO_PROCESS_POOL_SIZE} crypto workers"
+    )
+    args.target = args.url
+    if not args.url:
+        args.url = f"http://127.0.0.1:{args.port}"
+    try:
+        before = await measure("one by one", one_by_one, args)
+        after = await measure("bulk", bulk, args)
+    finally:
+        if not args.target:
+            await mongo_db.db_instance.command("dropDatabase")
+    print(f"speedup={after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--url", help="Target a running server instead")
+    parser.add_argument("--uri", default=settings.MONGO_DATABASE_URI)
+    parser.add_argument("--db-name", default=f"{settings.DB_NAME}_bench")
+    parser.add_argument("--port", type=int, default=free_port())
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    args.keep_db = False
+    asyncio.run(main(args))
@@ -0,0 +1,64 @@
+"""
+Compare the issue (encode) and verify (decode) throughput of the JWT
+backends of core.security (pyjwt only when installed) on the claims of an
+access token (no server, no database):
+
+    python -m benchmarks.bench_jwt_backends --iterations 20000
+
+The backend is selected with the JWT_BACKEND setting.
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+from bson import ObjectId
+
+from app.core.security import JWT_BACKENDS, get_jwt_backend, pyjwt
+
+
+def measure(function: Callable, iterations: int, rounds: int) -> float:
+    """Median over the rounds of the operations per second"""
+    throughputs: List[float] = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        throughputs.append(iterations / (time.perf_counter() - start))
+    return statistics.median(throughputs)
+
+
+def main(args) -> None:
+    claims = {
+        "exp": int(time.time()) + 3600,
+        "id": str(ObjectId()),
+        "role": "ACCOUNT_ADMIN",
+        "account_id": str(ObjectId()),
+        "ver": 0,
+    }
+    for name in JWT_BACKENDS:
+        if name == "pyjwt" and pyjwt is None:
+            print(f"{name:<6} skipped (PyJWT is not installed)")
+            continue
+        backend = get_jwt_backend(
+            name, secret_key=args.secret_key, algorithm="HS256"
+        )
+        token = backend.encode(claims)
+        issue = measure(
+            lambda: backend.encode(claims), args.iterations, args.rounds
+        )
+        verify = measure(
+            lambda: backend.decode(token), args.iterations, args.rounds
+        )
+        print(
+            f"{name:<6} issue={issue:10.0f}/s ({1e6 / issue:6.2f}us) "
+            f"verify={verify:10.0f}/s ({1e6 / verify:6.2f}us)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--secret-key", default="benchmark-secret-key")
+    main(parser.parse_args())
@@ -0,0 +1,103 @@
+"""
+Measure the per request overhead of the metrics middleware by calling the
+ASGI apps directly (no server, no database):
+
+* isolated: the middleware around a bare ASGI endpoint, which is where its
+  own cost can be told apart from the noise of the framework;
+* /ping: the FastAPI "/ping" route with and without the middleware.
+
+    python -m benchmarks.bench_metrics_middleware --requests 20000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from fastapi import FastAPI
+
+from app.core.http_metrics import MetricsMiddleware, RequestMetrics
+from app.create_app import ping_router
+
+SCOPE = {
+    "type": "http",
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/ping",
+    "raw_path": b"/ping",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [],
+    "server": ("bench", 80),
+    "client": ("bench", 1234),
+}
+
+
+async def bare_endpoint(scope, receive, send) -> None:
+    scope["endpoint"] = bare_endpoint
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"pong"})
+
+
+def build_ping_app(*, with_metrics: bool) -> Callable:
+    app = FastAPI()
+    ping_router(app)
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware, metrics=RequestMetrics())
+    return app
+
+
+async def receive() -> Dict:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message: Dict) -> None:
+    pass
+
+
+async def run(app: Callable, scope: Dict, requests: int) -> float:
+    """Mean microseconds per request"""
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def compare(
+    name: str, before: Callable, after: Callable, scope: Dict, args
+) -> None:
+    await run(before, scope, 1000)
+    await run(after, scope, 1000)
+    overheads: List[float] = []
+    for _ in range(args.rounds):
+        # Interleaved, so the drifts of the machine hit both
+        without_metrics = await run(before, scope, args.requests)
+        with_metrics = await run(after, scope, args.requests)
+        overheads.append(with_metrics - without_metrics)
+    print(
+        f"{name:<9} without={without_metrics:.2f}us "
+        f"with={with_metrics:.2f}us "
+        f"median overhead={statistics.median(overheads):.2f}us per request"
+    )
+
+
+async def main(args) -> None:
+    bare_app = MetricsMiddleware(bare_endpoint, metrics=RequestMetrics())
+    # The middleware reads the route templates from the app of the scope
+    scope = {**SCOPE, "app": FastAPI()}
+    await compare("isolated", bare_endpoint, bare_app, scope, args)
+    await compare(
+        "/ping",
+        build_ping_app(with_metrics=False),
+        build_ping_app(with_metrics=True),
+        SCOPE,
+        args,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
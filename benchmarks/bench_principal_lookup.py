@@ -0,0 +1,203 @@
+"""
+Compare the round trips and latency to resolve a principal (HOST and GUEST
+users) with the previous "aggregate then find_one" strategy and the single
+aggregation used by ``crud.user``.
+
+Run against a local mongod (the database is dropped before seeding):
+
+    python -m benchmarks.bench_principal_lookup --users 1000 --iterations 500
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from bson import ObjectId
+from pymongo import monitoring
+
+from app import crud
+from app.constants.role import Role
+from app.core.config import settings
+from app.core.db import mongo_db
+from app.core.security import get_password_hash
+from app.db.indexes import ensure_indexes
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def seed(db, *, users: int) -> Dict[str, List[ObjectId]]:
+    now = datetime.utcnow()
+    hashed_password = get_password_hash("benchmarkpassword")
+    roles = [
+        {"_id": ObjectId(), "name": role["name"], "is_active": True}
+        for role in (Role.GUEST, Role.ACCOUNT_ADMIN, Role.ADMIN)
+    ]
+    accounts = [
+        {"_id": ObjectId(), "name": f"account-{i}", "is_active": True}
+        for i in range(max(users // 100, 1))
+    ]
+    host_users, guest_users, user_roles = [], [], []
+    for i in range(users):
+        is_host = i % 2 == 0
+        user = {
+            "_id": ObjectId(),
+            "email": f"user-{i}@bench.io",
+            "full_name": f"user {i}",
+            "phone_number": "3101234567",
+            "hashed_password": hashed_password,
+            "account_id": random.choice(accounts)["_id"] if is_host else None,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        (host_users if is_host else guest_users).append(user)
+        if is_host:
+            user_roles.append(
+                {
+                    "user_id": user["_id"],
+                    "role_id": random.choice(roles)["_id"],
+                    "is_active": True,
+                }
+            )
+    await db.roles.insert_many(roles)
+    await db.accounts.insert_many(accounts)
+    await db.users.insert_many(host_users + guest_users)
+    await db.user_roles.insert_many(user_roles)
+    return {
+        "host": [user["_id"] for user in host_users],
+        "guest": [user["_id"] for user in guest_users],
+    }
+
+
+async def two_round_trips(user_id: ObjectId):
+    """Previous strategy: strict $unwind pipeline plus find_one fallback"""
+    user = None
+    async for user in crud.user.model.collection.aggregate(
+        _strict_pipeline(user_id)
+    ):
+        pass
+    if not user:
+        user = await crud.user.get(_id=str(user_id))
+    return user
+
+
+def _strict_pipeline(user_id: ObjectId) -> List[Dict]:
+    return [
+        {"$match": {"_id": user_id}},
+        {
+            "$lookup": {
+                "from": "accounts",
+                "localField": "account_id",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"name": 1}}],
+                "as": "account",
+            }
+        },
+        {"$unwind": "$account"},
+        {
+            "$lookup": {
+                "from": "user_roles",
+                "localField": "_id",
+                "foreignField": "user_id",
+                "pipeline": [{"$project": {"role_id": 1, "user_id": 1}}],
+                "as": "user_role",
+            }
+        },
+        {"$unwind": "$user_role"},
+        {
+            "$lookup": {
+                "from": "roles",
+                "let": {"role_id": "$user_role.role_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$role_id"]}}},
+                    {"$project": {"name": 1}},
+                ],
+                "as": "role",
+            }
+        },
+        {"$unwind": "$role"},
+        {"$project": {"user_role": 0}},
+    ]
+
+
+async def one_round_trip(user_id: ObjectId):
+    return await crud.user._get_with_account_and_role(_filter={"_id": user_id})
+
+
+async def measure(
+    name: str,
+    strategy: Callable,
+    user_ids: List[ObjectId],
+    counter: CommandCounter,
+    iterations: int,
+) -> Dict:
+    latencies = []
+    counter.count = 0
+    for _ in range(iterations):
+        user_id = random.choice(user_ids)
+        start = time.perf_counter()
+        await strategy(user_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "strategy": name,
+        "round_trips_per_lookup": counter.count / iterations,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "mean_ms": statistics.mean(latencies),
+    }
+
+
+async def main(args) -> None:
+    random.seed(args.seed)
+    counter = CommandCounter()
+    monitoring.register(counter)
+    mongo_db.uri = args.uri
+    mongo_db.db_name = args.db_name
+    mongo_db.init_db()
+    db = mongo_db.db_instance
+    await db.command("dropDatabase")
+    await ensure_indexes()
+    user_ids = await seed(db, users=args.users)
+
+    for kind in ("host", "guest"):
+        for name, strategy in (
+            ("before (aggregate + find_one)", two_round_trips),
+            ("after (single aggregate)", one_round_trip),
+        ):
+            result = await measure(
+                name, strategy, user_ids[kind], counter, args.iterations
+            )
+            print(
+                f"{kind:<6} {result['strategy']:<32} "
+                f"round trips={result['round_trips_per_lookup']:.2f} "
+                f"p50={result['p50_ms']:.3f}ms "
+                f"p99={result['p99_ms']:.3f}ms "
+                f"mean={result['mean_ms']:.3f}ms"
+            )
+    await db.command("dropDatabase")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--uri", default=settings.MONGO_DATABASE_URI)
+    parser.add_argument("--db-name", default=f"{settings.DB_NAME}_bench")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
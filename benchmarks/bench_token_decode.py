@@ -0,0 +1,73 @@
+"""
+Measure the per request cost of verifying an access token (no server, no
+database):
+
+* decode: the JWT backend decode plus the TokenPayload validation, as done
+  on every request before the token cache;
+* cache miss: deps.decode_token with an empty cache (decode and store);
+* cache hit: deps.decode_token with the token already verified.
+
+    python -m benchmarks.bench_token_decode --iterations 20000
+"""
+import argparse
+import statistics
+import time
+from datetime import timedelta
+from typing import Callable, List
+
+from bson import ObjectId
+
+from app import schemas
+from app.api.deps import decode_token
+from app.core import security
+from app.core.cache import token_cache
+
+
+def measure(function: Callable, iterations: int, rounds: int) -> float:
+    """Median over the rounds of the mean microseconds per call"""
+    means: List[float] = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        means.append((time.perf_counter() - start) / iterations * 1e6)
+    return statistics.median(means)
+
+
+def main(args) -> None:
+    token = security.create_access_token(
+        {
+            "id": str(ObjectId()),
+            "role": "ACCOUNT_ADMIN",
+            "account_id": str(ObjectId()),
+            "ver": 0,
+        },
+        expires_delta=timedelta(hours=1),
+    )
+
+    def decode() -> schemas.TokenPayload:
+        payload = security.jwt_backend.decode(token)
+        return schemas.TokenPayload(**payload)
+
+    def cache_miss() -> schemas.TokenPayload:
+        token_cache.clear()
+        return decode_token(token=token, credentials_exception=None)
+
+    def cache_hit() -> schemas.TokenPayload:
+        return decode_token(token=token, credentials_exception=None)
+
+    for name, function in (
+        ("decode", decode),
+        ("cache miss", cache_miss),
+        ("cache hit", cache_hit),
+    ):
+        function()
+        micros = measure(function, args.iterations, args.rounds)
+        print(f"{name:<11} {micros:8.2f}us per token")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    main(parser.parse_args())
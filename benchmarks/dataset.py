@@ -0,0 +1,262 @@
+"""
+Load a synthetic, deterministic (for a given --seed) RBAC dataset for scale
+testing into a dedicated database of the local mongod (dropped first):
+
+* --accounts accounts, a fraction of them inactive (soft deleted);
+* about --users-per-account users per account on average, with a Zipf
+  distribution (--skew) so a few accounts hold most of the users, plus
+  --guest-users users without account;
+* one user_role per account user over all the Role constants (the first
+  user of each account is its ACCOUNT_ADMIN), and a fraction of inactive
+  users (whose user_role is inactive too).
+
+The documents are built as dicts with Faker data and a single pre-hashed
+password (only its bcrypt salt changes between runs), and written with
+unordered insert_many batches while the next batch is built; the indexes
+are created after the load.
+
+    python -m benchmarks.dataset --accounts 10000 --users-per-account 100
+
+The app started on that database (e.g. python -m benchmarks.load_test
+--keep-db) adds the superadmin user on startup as usual.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from bson import ObjectId
+from faker import Faker
+
+from app.constants.role import Role
+from app.core.config import settings
+from app.core.db import mongo_db
+from app.core.security import get_password_hash
+from app.db.indexes import ensure_indexes
+
+PASSWORD = "benchmarkpassword"
+# Same locale as the Faker data of the tests
+FAKER_LOCALE = "es_MX"
+# Role of the account users after the first one (the ACCOUNT_ADMIN)
+ROLE_WEIGHTS = {
+    Role.GUEST["name"]: 0.8,
+    Role.ACCOUNT_MANAGER["name"]: 0.15,
+    Role.ACCOUNT_ADMIN["name"]: 0.04,
+    Role.ADMIN["name"]: 0.009,
+    Role.SUPER_ADMIN["name"]: 0.001,
+}
+# The created_at dates are spread over the CREATED_AT_SPREAD before
+# REFERENCE_DATE (fixed, so a seed always gives the same documents)
+REFERENCE_DATE = datetime(2021, 11, 15)
+CREATED_AT_SPREAD = timedelta(days=730)
+# Distinct names drawn by the users, Faker being the slowest part
+NAMES_POOL_SIZE = 10000
+
+
+def get_account_sizes(
+    rng: random.Random, *, accounts: int, users: int, skew: float
+) -> List[int]:
+    """
+    Users of each account following a Zipf distribution of exponent skew,
+    at least one per account
+    """
+    weights = [1 / (rank**skew) for rank in range(1, accounts + 1)]
+    total_weight = sum(weights)
+    sizes = [max(int(users * weight / total_weight), 1) for weight in weights]
+    # The rounding remainder goes to the biggest account
+    sizes[0] += max(users - sum(sizes), 0)
+    rng.shuffle(sizes)
+    return sizes
+
+
+class DatasetGenerator:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.fake = Faker(FAKER_LOCALE)
+        self.fake.seed_instance(args.seed)
+        self.now = REFERENCE_DATE
+        self._object_ids: int = 0
+        self.hashed_password: str = get_password_hash(PASSWORD)
+        self.roles: Dict[str, ObjectId] = {
+            role["name"]: self.object_id(self.now)
+            for role in (
+                Role.GUEST,
+                Role.ACCOUNT_ADMIN,
+                Role.ACCOUNT_MANAGER,
+                Role.ADMIN,
+                Role.SUPER_ADMIN,
+            )
+        }
+        self.names: List[str] = [
+            self.fake.name() for _ in range(NAMES_POOL_SIZE)
+        ]
+        self.users: int = 0
+
+    def object_id(self, created_at: datetime) -> ObjectId:
+        """Deterministic ObjectId with the timestamp of created_at"""
+        self._object_ids += 1
+        timestamp = int(created_at.replace(tzinfo=timezone.utc).timestamp())
+        return ObjectId(
+            timestamp.to_bytes(4, "big") + self._object_ids.to_bytes(8, "big")
+        )
+
+    def role_documents(self) -> List[Dict]:
+        return [
+            {
+                "_id": role_id,
+                "name": name,
+                "description": getattr(Role, name)["description"],
+                "is_active": True,
+                "created_at": self.now,
+                "updated_at": self.now,
+            }
+            for name, role_id in self.roles.items()
+        ]
+
+    def account_documents(self) -> List[Dict]:
+        accounts = []
+        for i in range(self.args.accounts):
+            created_at = self.created_at()
+            accounts.append(
+                {
+                    "_id": self.object_id(created_at),
+                    # Unique, as the names of the active accounts must be
+                    "name": f"{self.fake.company()} {i}",
+                    "description": self.fake.catch_phrase(),
+                    "is_active": (
+                        self.rng.random() >= self.args.inactive_accounts
+                    ),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            )
+        return accounts
+
+    def created_at(self) -> datetime:
+        return self.now - self.rng.random() * CREATED_AT_SPREAD
+
+    def user_document(self, account_id: Optional[ObjectId]) -> Dict:
+        number = self.users
+        self.users += 1
+        created_at = self.created_at()
+        return {
+            "_id": self.object_id(created_at),
+            "full_name": self.rng.choice(self.names),
+            "email": f"user{number}@{self.args.email_domain}",
+            "phone_number": str(self.rng.randrange(10**9, 10**10)),
+            "hashed_password": self.hashed_password,
+            "account_id": account_id,
+            "token_version": 0,
+            "is_active": self.rng.random() >= self.args.inactive_users,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+    def user_role_document(self, user: Dict, role_name: str) -> Dict:
+        return {
+            "_id": self.object_id(user["created_at"]),
+            "user_id": user["_id"],
+            "role_id": self.roles[role_name],
+            "is_active": user["is_active"],
+            "created_at": user["created_at"],
+            "updated_at": user["created_at"],
+        }
+
+    def users_batches(self, accounts: List[Dict]) -> Iterator[Dict]:
+        """Batches of users and user_roles of about batch_size users"""
+        sizes = get_account_sizes(
+            self.rng,
+            accounts=len(accounts),
+            users=len(accounts) * self.args.users_per_account,
+            skew=self.args.skew,
+        )
+        role_names = list(ROLE_WEIGHTS)
+        role_weights = list(ROLE_WEIGHTS.values())
+        batch = {"users": [], "user_roles": []}
+        for account, size in zip(accounts, sizes):
+            roles = [Role.ACCOUNT_ADMIN["name"]] + self.rng.choices(
+                role_names, weights=role_weights, k=size - 1
+            )
+            for role_name in roles:
+                user = self.user_document(account["_id"])
+                batch["users"].append(user)
+                batch["user_roles"].append(
+                    self.user_role_document(user, role_name)
+                )
+            if len(batch["users"]) >= self.args.batch_size:
+                yield batch
+                batch = {"users": [], "user_roles": []}
+        for _ in range(self.args.guest_users):
+            # GUEST users without account nor user_role
+            batch["users"].append(self.user_document(None))
+            if len(batch["users"]) >= self.args.batch_size:
+                yield batch
+                batch = {"users": [], "user_roles": []}
+        if batch["users"]:
+            yield batch
+
+
+async def insert_batch(db, batch: Dict[str, List[Dict]]) -> None:
+    for collection, documents in batch.items():
+        if documents:
+            await db[collection].insert_many(documents, ordered=False)
+
+
+async def load_dataset(db, args) -> Dict[str, int]:
+    generator = DatasetGenerator(args)
+    await db.roles.insert_many(generator.role_documents())
+    accounts = generator.account_documents()
+    await db.accounts.insert_many(accounts, ordered=False)
+    counts = {"accounts": len(accounts), "users": 0, "user_roles": 0}
+    pending: Optional[asyncio.Task] = None
+    for batch in generator.users_batches(accounts):
+        # The driver writes the previous batch (from its own threads)
+        # while this one is being built
+        if pending:
+            await pending
+        pending = asyncio.ensure_future(insert_batch(db, batch))
+        counts["users"] += len(batch["users"])
+        counts["user_roles"] += len(batch["user_roles"])
+    if pending:
+        await pending
+    return counts
+
+
+async def main(args) -> None:
+    mongo_db.uri = args.uri
+    mongo_db.db_name = args.db_name
+    mongo_db.init_db()
+    db = mongo_db.db_instance
+    await db.command("dropDatabase")
+    start = time.perf_counter()
+    counts = await load_dataset(db, args)
+    loaded = time.perf_counter()
+    await ensure_indexes()
+    print(
+        f"{counts['accounts']} accounts, {counts['users']} users and "
+        f"{counts['user_roles']} user_roles loaded in "
+        f"{loaded - start:.1f}s, indexes built in "
+        f"{time.perf_counter() - loaded:.1f}s "
+        f"(database {args.db_name}, password {PASSWORD!r})"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--uri", default=settings.MONGO_DATABASE_URI)
+    parser.add_argument("--db-name", default=f"{settings.DB_NAME}_bench")
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--users-per-account", type=int, default=100)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--guest-users", type=int, default=1000)
+    parser.add_argument("--inactive-accounts", type=float, default=0.02)
+    parser.add_argument("--inactive-users", type=float, default=0.05)
+    parser.add_argument("--email-domain", default="bench.io")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,409 @@
+"""
+HTTP load test of the service: start the app with uvicorn on a dedicated
+database of the local mongod (dropped before seeding, unless --keep-db is
+given to run on a dataset of benchmarks.dataset), seed users through the
+API, then run each scenario for --duration seconds with --concurrency
+clients and report the throughput and latency percentiles.
+
+The results (with the git commit) are written as JSON, so that runs can be
+compared across commits:
+
+    python -m benchmarks.load_test --concurrency 32 --duration 10
+    python -m benchmarks.load_test --scenarios users_me,roles --workers 2
+    python -m benchmarks.load_test --compare before.json after.json
+
+With --url an already running server is targeted instead, its database is
+not dropped (the users of each run have their own email prefix).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from app.api.api_v1.constants import NEXT_CURSOR_HEADER
+from app.core.config import settings
+from app.core.db import mongo_db
+
+PASSWORD = "benchmarkpassword"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+class Context:
+    """Tokens and users shared by the scenarios"""
+
+    def __init__(
+        self, *, prefix: str, superadmin_headers: Dict, emails: List[str]
+    ):
+        self.prefix: str = prefix
+        self.superadmin_headers: Dict = superadmin_headers
+        self.emails: List[str] = emails
+        self.user_headers: List[Dict] = []
+        self.next_cursor: Optional[str] = None
+        self.created = count()
+
+
+async def login(
+    client: httpx.AsyncClient, email: str, password: str = PASSWORD
+) -> httpx.Response:
+    return await client.post(
+        f"{settings.API_V1_PREFIX}/auth/access-token",
+        data={"username": email, "password": password},
+    )
+
+
+async def bearer(
+    client: httpx.AsyncClient, email: str, password: str = PASSWORD
+) -> Dict:
+    r = await login(client, email, password)
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def scenario_login(
+    client: httpx.AsyncClient, ctx: Context
+) -> httpx.Response:
+    return await login(client, random.choice(ctx.emails))
+
+
+async def scenario_users_me(
+    client: httpx.AsyncClient, ctx: Context
+) -> httpx.Response:
+    return await client.get(
+        f"{settings.API_V1_PREFIX}/users/me",
+        headers=random.choice(ctx.user_headers),
+    )
+
+
+async def scenario_accounts_me(
+    client: httpx.AsyncClient, ctx: Context
+) -> httpx.Response:
+    return await client.get(
+        f"{settings.API_V1_PREFIX}/accounts/me",
+        headers=ctx.superadmin_headers,
+    )
+
+
+async def scenario_roles(
+    client: httpx.AsyncClient, ctx: Context
+) -> httpx.Response:
+    return await client.get(
+        f"{settings.API_V1_PREFIX}/roles", headers=ctx.superadmin_headers
+    )
+
+
+async def scenario_users_page(
+    client: httpx.AsyncClient, ctx: Context
+) -> httpx.Response:
+    """Walk the users with the keyset cursor, starting over at the end"""
+    params = {"limit": 50}
+    if ctx.next_cursor:
+        params["cursor"] = ctx.next_cursor
+    r = await client.get(
+        f"{settings.API_V1_PREFIX}/users",
+        params=params,
+        headers=ctx.superadmin_headers,
+    )
+    ctx.next_cursor = r.headers.get(NEXT_CURSOR_HEADER)
+    return r
+
+
+async def scenario_create_user(
+    client: httpx.AsyncClient, ctx: Context
+) -> httpx.Response:
+    number = next(ctx.created)
+    return await client.post(
+        f"{settings.API_V1_PREFIX}/users",
+        json={
+            "email": f"{ctx.prefix}-load-{number}@bench.io",
+            "full_name": f"load user {number}",
+            "phone_number": "3101234567",
+            "password": PASSWORD,
+        },
+        headers=ctx.superadmin_headers,
+    )
+
+
+SCENARIOS: Dict[
+    str, Callable[[httpx.AsyncClient, Context], Awaitable[httpx.Response]]
+] = {
+    "login": scenario_login,
+    "users_me": scenario_users_me,
+    "accounts_me": scenario_accounts_me,
+    "roles": scenario_roles,
+    "users_page": scenario_users_page,
+    "create_user": scenario_create_user,
+}
+
+
+def percentile(latencies: List[float], quantile: float) -> float:
+    """Nearest rank percentile of sorted latencies"""
+    if not latencies:
+        return 0
+    rank = max(math.ceil(quantile * len(latencies)), 1)
+    return latencies[rank - 1]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    ctx: Context,
+    name: str,
+    *,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+) -> Dict:
+    scenario = SCENARIOS[name]
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    measuring = False
+
+    async def worker(deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                r = await scenario(client, ctx)
+                error = None if r.status_code == 200 else str(r.status_code)
+            except httpx.HTTPError as exc:
+                error = type(exc).__name__
+            if not measuring:
+                continue
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+            else:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(
+        *(worker(time.perf_counter() + warmup) for _ in range(concurrency))
+    )
+    measuring = True
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(worker(start + duration) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        "mean_ms": sum(latencies) / len(latencies) if latencies else 0,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": latencies[-1] if latencies else 0,
+    }
+
+
+async def seed(client: httpx.AsyncClient, args) -> Context:
+    superadmin_headers = await bearer(
+        client,
+        settings.FIRST_SUPER_ADMIN_EMAIL,
+        settings.FIRST_SUPER_ADMIN_PASSWORD,
+    )
+    # Unique per run, to run again against the same server (--url)
+    prefix = f"run-{int(time.time())}"
+    users = [
+        {
+            "email": f"{prefix}-{i}@bench.io",
+            "full_name": f"seed user {i}",
+            "phone_number": "3101234567",
+            "password": PASSWORD,
+        }
+        for i in range(args.users)
+    ]
+    # In batches of the rows accepted per bulk request
+    for start in range(0, len(users), settings.BULK_MAX_ROWS):
+        end = start + settings.BULK_MAX_ROWS
+        r = await client.post(
+            f"{settings.API_V1_PREFIX}/users/bulk",
+            content="".join(
+                json.dumps(user) + "\n" for user in users[start:end]
+            ),
+            headers={
+                **superadmin_headers,
+                "Content-Type": "application/x-ndjson",
+            },
+            timeout=None,
+        )
+        r.raise_for_status()
+    ctx = Context(
+        prefix=prefix,
+        superadmin_headers=superadmin_headers,
+        emails=[user["email"] for user in users],
+    )
+    ctx.user_headers = [
+        await bearer(client, email) for email in ctx.emails[: args.tokens]
+    ]
+    return ctx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_server(args) -> subprocess.Popen:
+    mongo_db.uri = args.uri
+    mongo_db.db_name = args.db_name
+    mongo_db.init_db()
+    if not args.keep_db:
+        await mongo_db.db_instance.command("dropDatabase")
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(args.port),
+            "--workers",
+            str(args.workers),
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ],
+        env={**os.environ, "DB_NAME": args.db_name},
+    )
+    async with httpx.AsyncClient(base_url=args.url) as client:
+        for _ in range(300):
+            try:
+                await client.get("/ping")
+                return server
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"The server did not start on {args.url}")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: Dict) -> None:
+    for name, result in results["scenarios"].items():
+        print(
+            f"{name:<12} rps={result['throughput_rps']:>8.1f} "
+            f"p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms "
+            f"p99={result['p99_ms']:.2f}ms errors={result['errors']}"
+        )
+
+
+def compare(before_path: str, after_path: str) -> None:
+    before, after = (
+        json.loads(Path(path).read_text())
+        for path in (before_path, after_path)
+    )
+    print(f"before {before['commit'][:10]}  after {after['commit'][:10]}")
+    for name, result in after["scenarios"].items():
+        previous = before["scenarios"].get(name)
+        if not previous:
+            continue
+        changes = " ".join(
+            f"{metric}={previous[metric]:.2f}->{result[metric]:.2f}"
+            f"({(result[metric] / previous[metric] - 1) * 100:+.1f}%)"
+            for metric in ("throughput_rps", "p50_ms", "p99_ms")
+            if previous[metric]
+        )
+        print(f"{name:<12} {changes}")
+
+
+async def main(args) -> None:
+    server = None
+    if not args.url:
+        args.url = f"http://127.0.0.1:{args.port}"
+        server = await start_server(args)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=args.url, limits=limits, timeout=60
+        ) as client:
+            ctx = await seed(client, args)
+            scenarios = {}
+            for name in args.scenarios.split(","):
+                scenarios[name] = await run_scenario(
+                    client,
+                    ctx,
+                    name,
+                    concurrency=args.concurrency,
+                    duration=args.duration,
+                    warmup=args.warmup,
+                )
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    results = {
+        "commit": git_commit(),
+        "date": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "users": args.users,
+            "workers": args.workers if server else None,
+        },
+        "scenarios": scenarios,
+    }
+    print_results(results)
+    output = Path(
+        args.output or RESULTS_DIR / f"load_test-{results['commit'][:10]}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--url", help="Target a running server instead")
+    parser.add_argument("--uri", default=settings.MONGO_DATABASE_URI)
+    parser.add_argument("--db-name", default=f"{settings.DB_NAME}_bench")
+    parser.add_argument(
+        "--keep-db",
+        action="store_true",
+        help="Keep the database (e.g. loaded by benchmarks.dataset)",
+    )
+    parser.add_argument("--port", type=int, default=free_port())
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Default: benchmarks/results/")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+    else:
+        random.seed(args.seed)
+        asyncio.run(main(args))
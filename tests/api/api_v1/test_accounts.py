@@ -1,3 +1,4 @@
+import json
 from typing import Any, Dict
 
 import pytest
@@ -6,8 +7,10 @@ from fastapi import status
 from httpx import AsyncClient
 
 from app import crud, models, schemas
+from app.api.api_v1.constants import NDJSON_MEDIA_TYPE
 from app.schemas.validators import ObjectId
 from tests.config import settings_test
+from tests.utils.db_commands import get_db_commands
 from tests.utils.user import regular_user_email
 from tests.utils.validators import check_if_element_exists_in_list
 
@@ -57,6 +60,48 @@ async def test_get_all_accounts_by_authorised_user(
     )
 
 
+@pytest.mark.asyncio
+async def test_export_accounts(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    account_name = faker_data.name()
+    account_description = faker_data.paragraph()
+    account_in = schemas.AccountCreate(
+        name=account_name, description=account_description
+    )
+    await crud.account.create(obj_in=account_in)
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/accounts/export",
+        headers=superadmin_token_headers,
+    )
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["content-type"].startswith(NDJSON_MEDIA_TYPE)
+    accounts = [json.loads(line) for line in r.text.splitlines()]
+    account_created_in_auto_init_db = 1
+    accounts_created = 1
+    assert len(accounts) == accounts_created + account_created_in_auto_init_db
+    account_conditions = {
+        "name": account_name,
+        "description": account_description,
+    }
+    assert check_if_element_exists_in_list(
+        _list=accounts, _conditions=account_conditions
+    )
+
+
+@pytest.mark.asyncio
+async def test_export_accounts_by_unauthorized_user(
+    client: AsyncClient, auto_init_db: Any, normal_user_token_headers: Dict
+) -> None:
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/accounts/export",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 401
+    result = r.json()
+    assert result["detail"] == "Not enough permissions"
+
+
 @pytest.mark.asyncio
 async def test_get_account_for_user(
     client: AsyncClient, auto_init_db: Any, normal_user_token_headers: Dict
@@ -152,6 +197,8 @@ async def test_add_user_to_account(
         status.HTTP_200_OK <= r.status_code < status.HTTP_300_MULTIPLE_CHOICES
     )
     assert user["account_id"] == str(account.id)
+    # The authentication, the account check and a find_one_and_update
+    assert get_db_commands(r) == 3
 
 
 @pytest.mark.asyncio
@@ -244,6 +291,35 @@ async def test_update_account(
     assert updated_account["name"] == new_account_name
 
 
+@pytest.mark.asyncio
+async def test_update_account_with_exists_name(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    accounts = []
+    for _ in range(2):
+        account_in = schemas.AccountCreate(
+            name=faker_data.company(), description=faker_data.paragraph()
+        )
+        accounts.append(await crud.account.create(obj_in=account_in))
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/accounts/{accounts[0].id}",
+        headers=superadmin_token_headers,
+        json={"name": accounts[1].name},
+    )
+    assert r.status_code == status.HTTP_409_CONFLICT
+    assert r.json()["detail"] == (
+        f"An account with name <<{accounts[1].name}>> already exists"
+    )
+    # The name of an inactive account can be reused
+    await crud.account.partial_remove(_id=str(accounts[1].id))
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/accounts/{accounts[0].id}",
+        headers=superadmin_token_headers,
+        json={"name": accounts[1].name},
+    )
+    assert r.status_code == status.HTTP_200_OK
+
+
 @pytest.mark.asyncio
 async def test_update_account_without_exists_account(
     client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
@@ -447,6 +523,8 @@ async def test_get_users_for_own_account(
     users_created_in_auto_init_db = 1
     users_created = 2
     assert len(users) == users_created + users_created_in_auto_init_db
+    # The account is joined by the authentication, not read again
+    assert get_db_commands(r) == 2
     user_conditions = {"email": user_in.email}
     assert check_if_element_exists_in_list(
         _list=users, _conditions=user_conditions
@@ -1,12 +1,22 @@
+import time
+from datetime import datetime, timedelta
 from typing import Any, Dict
 
 import pytest
+from bson import ObjectId
 from faker import Faker
 from fastapi import status
 from httpx import AsyncClient
 
-from app.core.security import verify_password
+from app import crud, schemas
+from app.api.deps import decode_token
+from app.core.cache import clear_principals, token_cache
+from app.core.revocation import revocation_filter
+from app.core.security import create_access_token, verify_password
+from app.crud.revoked_token import get_jti_key
+from app.models import RevokedToken
 from tests.config import settings_test
+from tests.utils.db_commands import get_db_commands
 from tests.utils.user import (
     regular_user_email,
     regular_user_full_name,
@@ -33,6 +43,74 @@ async def test_use_access_token(
     assert result.get("full_name") == regular_user_full_name
 
 
+@pytest.mark.asyncio
+async def test_use_access_token_after_role_change(
+    client: AsyncClient,
+    auto_init_db: Any,
+    normal_user_token_headers: Dict[str, str],
+) -> None:
+    user = await crud.user.get_by_email(email=regular_user_email)
+    role = await crud.role.get_by_name(name="ACCOUNT_MANAGER")
+    user_role_in = schemas.UserRoleCreate(
+        user_id=str(user.id), role_id=str(role.id)
+    )
+    await crud.user_role.create(obj_in=user_role_in)
+
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/auth/test-token",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_use_cached_access_token_after_role_change(
+    client: AsyncClient,
+    auto_init_db: Any,
+    normal_user_token_headers: Dict[str, str],
+) -> None:
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/auth/test-token",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == status.HTTP_200_OK
+    user = await crud.user.get_by_email(email=regular_user_email)
+    role = await crud.role.get_by_name(name="ACCOUNT_MANAGER")
+    user_role_in = schemas.UserRoleCreate(
+        user_id=str(user.id), role_id=str(role.id)
+    )
+    await crud.user_role.create(obj_in=user_role_in)
+
+    # The token payload is cached, its version is still checked
+    hits = token_cache.hits
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/auth/test-token",
+        headers=normal_user_token_headers,
+    )
+    assert token_cache.hits == hits + 1
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_decode_token_is_cached_until_exp(client: AsyncClient) -> None:
+    user_id = ObjectId()
+    token = create_access_token(
+        {"id": str(user_id), "ver": 0}, expires_delta=timedelta(seconds=2)
+    )
+    hits = token_cache.hits
+    for _ in range(2):
+        token_data = decode_token(token=token, credentials_exception=None)
+        assert token_data.id == user_id
+    assert token_cache.hits == hits + 1
+    # Evicted at the exp of the token (whole seconds), not after the TTL
+    expires_in = max(
+        expires_at - time.monotonic()
+        for expires_at, value in token_cache._data.values()
+        if value is token_data
+    )
+    assert expires_in <= 2
+
+
 @pytest.mark.asyncio
 async def test_login_access_token_without_exists_user(
     client: AsyncClient, auto_init_db: Any
@@ -63,6 +141,133 @@ async def test_login_access_token_with_invalid_password(
     assert result["detail"] == "Incorrect email or password"
 
 
+async def login(client: AsyncClient) -> Dict[str, str]:
+    login_data = {
+        "username": settings_test.FIRST_SUPER_ADMIN_EMAIL,
+        "password": settings_test.FIRST_SUPER_ADMIN_PASSWORD,
+    }
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/auth/access-token", data=login_data
+    )
+    assert r.status_code == status.HTTP_200_OK
+    return r.json()
+
+
+async def refresh(client: AsyncClient, refresh_token: str):
+    return await client.post(
+        f"{settings_test.API_V1_PREFIX}/auth/refresh-token",
+        json={"refresh_token": refresh_token},
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_access_token(
+    client: AsyncClient, auto_init_db: Any
+) -> None:
+    tokens = await login(client)
+    r = await refresh(client, tokens["refresh_token"])
+    assert r.status_code == status.HTTP_200_OK
+    # The rotated token lookup, the new token insert and the user claims
+    assert get_db_commands(r) == 3
+    assert "crypto" not in r.headers["server-timing"]
+    new_tokens = r.json()
+    assert new_tokens["refresh_token"] != tokens["refresh_token"]
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/auth/test-token",
+        headers={"Authorization": f"Bearer {new_tokens['access_token']}"},
+    )
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json()["email"] == settings_test.FIRST_SUPER_ADMIN_EMAIL
+
+
+@pytest.mark.asyncio
+async def test_refresh_access_token_reused(
+    client: AsyncClient, auto_init_db: Any
+) -> None:
+    tokens = await login(client)
+    r = await refresh(client, tokens["refresh_token"])
+    new_tokens = r.json()
+    r = await refresh(client, tokens["refresh_token"])
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+    assert r.json()["detail"] == "Invalid refresh token"
+    # The token rotated from the reused one is revoked too
+    r = await refresh(client, new_tokens["refresh_token"])
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_refresh_access_token_after_role_change(
+    client: AsyncClient, auto_init_db: Any
+) -> None:
+    tokens = await login(client)
+    user = await crud.user.get_by_email(
+        email=settings_test.FIRST_SUPER_ADMIN_EMAIL
+    )
+    await crud.user.increment_token_version(_id=user.id)
+    clear_principals()
+    r = await refresh(client, tokens["refresh_token"])
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_logout(client: AsyncClient, auto_init_db: Any) -> None:
+    tokens = await login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/auth/logout",
+        headers=headers,
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json()["success"] == "Logged out"
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/auth/test-token", headers=headers
+    )
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+    r = await refresh(client, tokens["refresh_token"])
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+    # The other sessions of the user are not revoked
+    other_tokens = await login(client)
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/auth/test-token",
+        headers={"Authorization": f"Bearer {other_tokens['access_token']}"},
+    )
+    assert r.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_revoked_token_in_another_worker(
+    client: AsyncClient, auto_init_db: Any
+) -> None:
+    tokens = await login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    for _ in range(2):
+        r = await client.post(
+            f"{settings_test.API_V1_PREFIX}/auth/test-token", headers=headers
+        )
+        assert r.status_code == status.HTTP_200_OK
+    # Not revoked, the revocation filter answers without a query (and the
+    # user is cached)
+    assert get_db_commands(r) == 0
+    # Revoked by another worker, seen once the filter is synced
+    token_data = decode_token(
+        token=tokens["access_token"], credentials_exception=None
+    )
+    await RevokedToken.collection.insert_one(
+        {
+            "key": get_jti_key(token_data.jti),
+            "expires_at": datetime.utcfromtimestamp(token_data.exp),
+            "created_at": datetime.utcnow(),
+        }
+    )
+    revocation_filter.loader = crud.revoked_token.iter_keys
+    await revocation_filter.sync()
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/auth/test-token", headers=headers
+    )
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+
+
 @pytest.mark.asyncio
 async def test_hash_password(
     client: AsyncClient,
@@ -82,3 +287,18 @@ async def test_hash_password(
         plain_password=password,
         hashed_password=result,
     )
+
+
+@pytest.mark.asyncio
+async def test_hash_password_server_timing(
+    client: AsyncClient,
+    auto_init_db: Any,
+) -> None:
+    data = {"password": faker_data.password(length=12)}
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/auth/hash-password", json=data
+    )
+    assert r.status_code == 200
+    server_timing = r.headers["server-timing"]
+    for metric in ("crypto", "endpoint", "encode", "total"):
+        assert f"{metric};dur=" in server_timing
@@ -0,0 +1,90 @@
+from typing import Any, Dict
+
+import pytest
+from httpx import AsyncClient
+
+from tests.config import settings_test
+
+
+@pytest.mark.asyncio
+async def test_get_db_pool_stats(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/monitoring/db-pool",
+        headers=superadmin_token_headers,
+    )
+    assert r.status_code == 200
+    pools = r.json()
+    assert pools
+    for pool in pools.values():
+        assert pool["connections_created"] >= 1
+        assert "checked_out" in pool
+        assert "wait_queue" in pool
+
+
+@pytest.mark.asyncio
+async def test_get_db_pool_stats_by_unauthorized_user(
+    client: AsyncClient, auto_init_db: Any, normal_user_token_headers: Dict
+) -> None:
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/monitoring/db-pool",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 401
+    result = r.json()
+    assert result["detail"] == "Not enough permissions"
+
+
+@pytest.mark.asyncio
+async def test_get_db_commands_stats(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/monitoring/db-commands",
+        headers=superadmin_token_headers,
+    )
+    assert r.status_code == 200
+    stats = r.json()
+    assert "CRUDUser._get_with_account_and_role" in stats["operations"]
+    assert stats["collections"]["users"]["count"] >= 1
+    assert "p99_ms" in stats["commands"]["aggregate"]
+
+
+@pytest.mark.asyncio
+async def test_get_profiles(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/monitoring/profiles",
+        headers=superadmin_token_headers,
+    )
+    assert r.status_code == 200
+    assert isinstance(r.json(), list)
+
+
+@pytest.mark.asyncio
+async def test_download_profile_not_exists(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/monitoring/profiles/not-exists",
+        headers=superadmin_token_headers,
+    )
+    assert r.status_code == 404
+    result = r.json()
+    assert result["detail"] == "Profile with id <<not-exists>> not exists"
+
+
+@pytest.mark.asyncio
+async def test_get_event_loop_stats(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/monitoring/event-loop",
+        headers=superadmin_token_headers,
+    )
+    assert r.status_code == 200
+    stats = r.json()
+    assert "p99_ms" in stats
+    assert "blocked" in stats
@@ -6,6 +6,7 @@ from fastapi import status
 from httpx import AsyncClient
 
 from app import crud, schemas
+from app.constants.role import Role
 from tests.config import settings_test
 from tests.utils.validators import check_if_element_exists_in_list
 
@@ -37,3 +38,22 @@ async def test_get_all_roles_by_authorised_user(
     assert check_if_element_exists_in_list(
         _list=roles, _conditions=role_conditions
     )
+
+
+@pytest.mark.asyncio
+async def test_get_all_roles_with_revoked_token(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    superadmin = await crud.user.get_by_email(
+        email=settings_test.FIRST_SUPER_ADMIN_EMAIL
+    )
+    user_role = await crud.user_role.get_by_user_id(user_id=superadmin.id)
+    role = await crud.role.get_by_name(name=Role.ADMIN["name"])
+    user_role_in = schemas.UserRoleUpdate(role_id=str(role.id))
+    await crud.user_role._update(_id=str(user_role.id), obj_in=user_role_in)
+
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/roles",
+        headers=superadmin_token_headers,
+    )
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
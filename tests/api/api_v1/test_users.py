@@ -1,3 +1,4 @@
+import json
 from typing import Any, Dict
 
 import pytest
@@ -7,8 +8,10 @@ from fastapi import status
 from httpx import AsyncClient
 
 from app import crud, models, schemas
+from app.api.api_v1.constants import NDJSON_MEDIA_TYPE, NEXT_CURSOR_HEADER
 from app.core.security import verify_password
 from tests.config import settings_test
+from tests.utils.db_commands import get_db_commands
 from tests.utils.user import regular_user_email
 from tests.utils.validators import check_if_element_exists_in_list
 
@@ -57,6 +60,83 @@ async def test_get_all_users_by_authorised_user(
     )
 
 
+@pytest.mark.asyncio
+async def test_export_users(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    email = faker_data.email()
+    user_in = schemas.UserCreate(
+        email=email,
+        password=faker_data.password(length=12),
+        full_name=faker_data.name(),
+        phone_number=faker_data.random_number(digits=10),
+        account_id=str(ObjectId()),
+    )
+    await crud.user.create(obj_in=user_in)
+
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/users/export",
+        headers=superadmin_token_headers,
+    )
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["content-type"].startswith(NDJSON_MEDIA_TYPE)
+    users = [json.loads(line) for line in r.text.splitlines()]
+    user_created_in_auto_init_db = 1
+    users_created = 1
+    assert len(users) == users_created + user_created_in_auto_init_db
+    assert check_if_element_exists_in_list(
+        _list=users, _conditions={"email": email}
+    )
+    assert all("hashed_password" not in user for user in users)
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_with_cursor(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    user_in = schemas.UserCreate(
+        email=faker_data.email(),
+        password=faker_data.password(length=12),
+        full_name=faker_data.name(),
+        phone_number=faker_data.random_number(digits=10),
+        account_id=str(ObjectId()),
+    )
+    await crud.user.create(obj_in=user_in)
+
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/users",
+        headers=superadmin_token_headers,
+        params={"limit": 1},
+    )
+    assert r.status_code == status.HTTP_200_OK
+    first_page = r.json()
+    next_cursor = r.headers[NEXT_CURSOR_HEADER]
+
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/users",
+        headers=superadmin_token_headers,
+        params={"limit": 1, "cursor": next_cursor},
+    )
+    assert r.status_code == status.HTTP_200_OK
+    second_page = r.json()
+    assert len(first_page) == len(second_page) == 1
+    assert first_page[0]["id"] != second_page[0]["id"]
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_with_invalid_cursor(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    invalid_cursor = "invalid"
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/users",
+        headers=superadmin_token_headers,
+        params={"cursor": invalid_cursor},
+    )
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+    assert r.json()["detail"] == f"Invalid cursor <<{invalid_cursor}>>"
+
+
 @pytest.mark.asyncio
 async def test_get_user_by_id(
     client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
@@ -158,6 +238,110 @@ async def test_create_user(
     assert str(user_found.account_id) == user_created["account_id"]
 
 
+@pytest.mark.asyncio
+async def test_create_users_bulk(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    def user_data(email: str) -> Dict:
+        return {
+            "email": email,
+            "password": faker_data.password(length=12),
+            "full_name": faker_data.name(),
+            "phone_number": faker_data.random_number(digits=10),
+            "account_id": str(ObjectId()),
+        }
+
+    existing_email = faker_data.email()
+    await crud.user.create(
+        obj_in=schemas.UserCreate(**user_data(existing_email))
+    )
+    new_email = faker_data.email()
+    rows = [
+        user_data(new_email),
+        user_data(existing_email),
+        user_data(new_email),
+        {"email": faker_data.email()},
+    ]
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/users/bulk",
+        headers={
+            **superadmin_token_headers,
+            "content-type": NDJSON_MEDIA_TYPE,
+        },
+        content="\n".join(json.dumps(row) for row in rows),
+    )
+    assert r.status_code == status.HTTP_200_OK
+    results = r.json()
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    user_found = await crud.user.get_by_email(email=new_email)
+    assert results[0]["id"] == str(user_found.id)
+    assert not results[0]["error"]
+    assert not results[1]["id"]
+    assert results[1]["error"] == (
+        f"User with email <<{existing_email}>> already exists"
+    )
+    assert results[2]["error"] == (
+        f"User with email <<{new_email}>> already exists"
+    )
+    assert not results[3]["id"]
+    assert "password" in results[3]["error"]
+
+
+@pytest.mark.asyncio
+async def test_create_users_bulk_with_invalid_model_rows(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    def user_data(**fields: Any) -> Dict:
+        return {
+            "email": faker_data.email(),
+            "password": faker_data.password(length=12),
+            "full_name": faker_data.name(),
+            "phone_number": str(faker_data.random_number(digits=10)),
+            **fields,
+        }
+
+    # Valid schema rows, invalid for the model (too long fields)
+    rows = [
+        user_data(),
+        user_data(phone_number="1" * 11),
+        user_data(),
+        user_data(full_name="a" * 256),
+    ]
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/users/bulk",
+        headers={
+            **superadmin_token_headers,
+            "content-type": NDJSON_MEDIA_TYPE,
+        },
+        content="\n".join(json.dumps(row) for row in rows),
+    )
+    assert r.status_code == status.HTTP_200_OK
+    results = r.json()
+    for index in (0, 2):
+        user_found = await crud.user.get_by_email(email=rows[index]["email"])
+        assert results[index]["id"] == str(user_found.id)
+        assert not results[index]["error"]
+    assert not results[1]["id"]
+    assert results[1]["error"].startswith("phone_number: ")
+    assert not results[3]["id"]
+    assert results[3]["error"].startswith("full_name: ")
+    assert not await crud.user.get_by_email(email=rows[1]["email"])
+
+
+@pytest.mark.asyncio
+async def test_create_users_bulk_with_invalid_body(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/users/bulk",
+        headers=superadmin_token_headers,
+        json={"email": faker_data.email()},
+    )
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+    result = r.json()
+    assert result["detail"] == "Expected a JSON array or NDJSON of users"
+
+
 @pytest.mark.asyncio
 async def test_create_user_with_exists_email(
     client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
@@ -320,6 +504,8 @@ async def test_update_user(
     assert updated_user["email"] == new_user_email
     assert updated_user["full_name"] == new_user_full_name
     assert updated_user["phone_number"] == str(new_user_phone_number)
+    # The authentication and a single find_one_and_update
+    assert get_db_commands(r) == 2
     user_found = await crud.user.get_by_email(email=new_user_email)
     assert verify_password(
         plain_password=new_user_password,
@@ -327,6 +513,33 @@ async def test_update_user(
     )
 
 
+@pytest.mark.asyncio
+async def test_update_user_with_exists_email(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    users = []
+    for _ in range(2):
+        user_in = schemas.UserCreate(
+            email=faker_data.email(),
+            password=faker_data.password(length=12),
+            full_name=faker_data.name(),
+            phone_number=faker_data.random_number(digits=10),
+        )
+        users.append(await crud.user.create(obj_in=user_in))
+
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/users/{users[0].id}",
+        headers=superadmin_token_headers,
+        json={"email": users[1].email},
+    )
+    assert r.status_code == status.HTTP_409_CONFLICT
+    assert r.json()["detail"] == (
+        f"User with email <<{users[1].email}>> already exists"
+    )
+    user_found = await crud.user.get(_id=str(users[0].id))
+    assert user_found.email == users[0].email
+
+
 @pytest.mark.asyncio
 async def test_update_user_without_exists_user(
     client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
@@ -434,6 +647,34 @@ async def test_get_me_user_super_admin(
     assert current_user["account"]
 
 
+@pytest.mark.asyncio
+async def test_get_me_user_server_timing(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/users/me",
+        headers=superadmin_token_headers,
+    )
+    assert r.status_code == 200
+    server_timing = r.headers["server-timing"]
+    for metric in ("jwt", "db", "endpoint", "encode", "total"):
+        assert f"{metric};dur=" in server_timing
+
+
+@pytest.mark.asyncio
+async def test_get_me_user_db_commands(
+    client: AsyncClient, auto_init_db: Any, superadmin_token_headers: Dict
+) -> None:
+    # The aggregation of the authentication, then the principal is cached
+    for db_commands in (1, 0):
+        r = await client.get(
+            f"{settings_test.API_V1_PREFIX}/users/me",
+            headers=superadmin_token_headers,
+        )
+        assert r.status_code == 200
+        assert get_db_commands(r) == db_commands
+
+
 @pytest.mark.asyncio
 async def test_get_me_user_normal_user(
     client: AsyncClient, auto_init_db: Any, normal_user_token_headers: Dict
@@ -475,3 +716,31 @@ async def test_update_me_user(
     assert updated_user["email"] == new_user_email
     assert updated_user["full_name"] == new_user_full_name
     assert updated_user["phone_number"] == str(new_user_phone_number)
+
+
+@pytest.mark.asyncio
+async def test_get_me_user_after_update_me_user(
+    client: AsyncClient, auto_init_db: Any, normal_user_token_headers: Dict
+) -> None:
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/users/me",
+        headers=normal_user_token_headers,
+    )
+    assert r.json()["email"] == regular_user_email
+
+    new_user_full_name = faker_data.name()
+    r = await client.post(
+        f"{settings_test.API_V1_PREFIX}/users/me",
+        headers=normal_user_token_headers,
+        json=dict(full_name=new_user_full_name),
+    )
+    assert (
+        status.HTTP_200_OK <= r.status_code < status.HTTP_300_MULTIPLE_CHOICES
+    )
+
+    r = await client.get(
+        f"{settings_test.API_V1_PREFIX}/users/me",
+        headers=normal_user_token_headers,
+    )
+    current_user = r.json()
+    assert current_user["full_name"] == new_user_full_name
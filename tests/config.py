@@ -18,6 +18,19 @@ class SettingsTest(BaseSettings):
     FIRST_SUPER_ADMIN_PASSWORD: str
     FIRST_SUPER_ADMIN_ACCOUNT_NAME: str
     FIRST_SUPER_ADMIN_PHONE_NUMBER: str
+    CRYPTO_PROCESS_POOL_SIZE: int = 2
+    SERVER_TIMING_HEADER: bool = True
+    # Debug X-DB-Commands header (see core.timing)
+    DB_COMMANDS_HEADER: bool = True
+    # On demand profiling of the requests (see core.profiling)
+    PROFILING_ENABLED: bool = False
+    PROFILING_INTERVAL_MS: float = 2
+    PROFILING_MAX_SECONDS: float = 30
+    PROFILING_MAX_PROFILES: int = 20
+    # Event loop lag monitor (see core.loop_monitor)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_LAG_INTERVAL_MS: float = 50
+    LOOP_BLOCKED_THRESHOLD_MS: float = 100
     FAKER_DATA_LOCATE: str = "es_MX"  # For México faker data
 
     DB_HOST: str
@@ -25,6 +38,14 @@ class SettingsTest(BaseSettings):
     DB_NAME: str
 
     MONGO_DATABASE_URI: str = None
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 30000
+    # Comma separated wire compressors, e.g. "zstd,snappy,zlib" (zstd and
+    # snappy need the zstandard and python-snappy packages)
+    MONGO_COMPRESSORS: Optional[str] = None
 
     @validator("MONGO_DATABASE_URI", pre=True)
     def assemble_db_connection(
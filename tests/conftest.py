@@ -4,8 +4,10 @@ from typing import Any, Dict, Generator
 import pytest
 from httpx import AsyncClient
 
+from app.core.cache import clear_principals
 from app.core.db import mongo_db
 from app.create_app import create_app
+from app.db.indexes import ensure_indexes
 from app.db.init_db import init_db
 from tests.config import settings_test
 from tests.utils.user import (
@@ -45,6 +47,8 @@ async def auto_init_db():
 @pytest.fixture(autouse=True)
 async def clean_db(client: AsyncClient, db: Any):
     await db.command("dropDatabase")
+    await ensure_indexes()
+    clear_principals()
 
 
 @pytest.fixture()
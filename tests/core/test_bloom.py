@@ -0,0 +1,26 @@
+import pytest
+from httpx import AsyncClient
+
+from app.core.bloom import BloomFilter
+
+
+@pytest.mark.asyncio
+async def test_bloom_filter_without_false_negatives(
+    client: AsyncClient,
+) -> None:
+    bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"key{i}" for i in range(1000)]
+    for key in keys:
+        bloom_filter.add(key)
+    assert len(bloom_filter) == 1000
+    assert all(key in bloom_filter for key in keys)
+
+
+@pytest.mark.asyncio
+async def test_bloom_filter_false_positive_rate(client: AsyncClient) -> None:
+    bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom_filter.add(f"key{i}")
+    false_positives = sum(f"other{i}" in bloom_filter for i in range(10000))
+    assert false_positives / 10000 < 0.02
+    assert "other" not in BloomFilter(capacity=1000, error_rate=0.01)
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.cache import TTLCache
+
+
+@pytest.mark.asyncio
+async def test_cache_get_and_set(client: AsyncClient) -> None:
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    assert cache.get("not_exists") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used(client: AsyncClient) -> None:
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("first", 1)
+    cache.set("second", 2)
+    cache.get("first")
+    cache.set("third", 3)
+    assert cache.get("second") is None
+    assert cache.get("first") == 1
+    assert cache.get("third") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_expires_entries(client: AsyncClient) -> None:
+    cache = TTLCache(maxsize=2, ttl=0.01)
+    cache.set("key", "value")
+    cache.set("long_lived", "value", ttl=60)
+    time.sleep(0.02)
+    assert cache.get("key") is None
+    assert cache.get("long_lived") == "value"
+    assert cache.stats()["expirations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_invalidate(client: AsyncClient) -> None:
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("key", "value")
+    cache.invalidate("key")
+    cache.invalidate("not_exists")
+    assert cache.get("key") is None
+    assert len(cache) == 0
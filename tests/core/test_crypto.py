@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from faker import Faker
+from httpx import AsyncClient
+
+from app.core.crypto import crypto_service
+from app.core.security import jwt_backend, verify_password
+from tests.config import settings_test
+
+faker_data = Faker(locale=settings_test.FAKER_DATA_LOCATE)
+
+
+@pytest.mark.asyncio
+async def test_get_password_hash(client: AsyncClient) -> None:
+    password = faker_data.password(length=12)
+    hashed_password = await crypto_service.get_password_hash(password)
+    assert hashed_password != password
+    assert verify_password(password, hashed_password)
+
+
+@pytest.mark.asyncio
+async def test_verify_password(client: AsyncClient) -> None:
+    password = faker_data.password(length=12)
+    hashed_password = await crypto_service.get_password_hash(password)
+    assert await crypto_service.verify_password(password, hashed_password)
+    assert not await crypto_service.verify_password(
+        faker_data.password(length=12), hashed_password
+    )
+
+
+@pytest.mark.asyncio
+async def test_crypto_service_stats(client: AsyncClient) -> None:
+    passwords_to_hash = 4
+    completed_before = crypto_service.stats()["completed"]
+    await asyncio.gather(
+        *[
+            crypto_service.get_password_hash(faker_data.password(length=12))
+            for _ in range(passwords_to_hash)
+        ]
+    )
+    stats = crypto_service.stats()
+    assert stats["max_workers"] > 0
+    assert stats["pending"] == 0
+    assert stats["queued"] == 0
+    assert stats["completed"] == completed_before + passwords_to_hash
+
+
+@pytest.mark.asyncio
+async def test_create_access_token(client: AsyncClient) -> None:
+    token = await crypto_service.create_access_token({"id": "user"})
+    assert jwt_backend.decode(token)["id"] == "user"
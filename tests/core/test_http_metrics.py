@@ -0,0 +1,25 @@
+import pytest
+from httpx import AsyncClient
+
+from app.core.http_metrics import RequestMetrics
+
+
+@pytest.mark.asyncio
+async def test_request_metrics_render(client: AsyncClient) -> None:
+    metrics = RequestMetrics(buckets=(0.01, 0.1))
+    metrics.observe("GET", "/users/{user_id}", 200, 0.005)
+    metrics.observe("GET", "/users/{user_id}", 200, 0.05)
+    metrics.observe("GET", "/users/{user_id}", 200, 1)
+    rendered = metrics.render()
+    labels = 'method="GET",route="/users/{user_id}",status="200"'
+    assert f"http_requests_total{{{labels}}} 3" in rendered
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.01"}} 1' in (
+        rendered
+    )
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.1"}} 2' in (
+        rendered
+    )
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3' in (
+        rendered
+    )
+    assert f"http_request_duration_seconds_count{{{labels}}} 3" in rendered
@@ -0,0 +1,27 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.loop_monitor import LoopLagMonitor
+
+
+@pytest.mark.asyncio
+async def test_loop_monitor_blocking_call(
+    client: AsyncClient, caplog: pytest.LogCaptureFixture
+) -> None:
+    monitor = LoopLagMonitor(interval=0.01, threshold_ms=50)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    with caplog.at_level(logging.WARNING, logger="app.core.loop_monitor"):
+        # Blocks the loop well over the threshold plus the watchdog interval
+        time.sleep(0.3)
+        await asyncio.sleep(0.05)
+    await monitor.stop()
+    stats = monitor.stats()
+    assert stats["blocked"] >= 1
+    assert stats["max_ms"] >= 200
+    assert stats["count"] >= 5
+    assert "test_loop_monitor_blocking_call" in caplog.text
@@ -0,0 +1,39 @@
+import pytest
+from httpx import AsyncClient
+
+from app import crud
+from app.core.metrics import Histogram, command_metrics, get_query_shape
+from app.schemas.validators import ObjectId
+
+
+@pytest.mark.asyncio
+async def test_histogram_percentiles(client: AsyncClient) -> None:
+    histogram = Histogram()
+    for micros in range(1, 10001):
+        histogram.record(micros)
+    assert histogram.count == 10000
+    assert histogram.max == 10000
+    assert abs(histogram.percentile(0.5) - 5000) <= 5000 / 64
+    assert abs(histogram.percentile(0.99) - 9900) <= 9900 / 64
+    assert histogram.snapshot()["max_ms"] == 10
+
+
+@pytest.mark.asyncio
+async def test_query_shape_redacts_values(client: AsyncClient) -> None:
+    _filter = {"email": "user@email.com", "$or": [{"age": {"$gt": 18}}]}
+    assert get_query_shape(_filter) == {
+        "email": "?",
+        "$or": [{"age": {"$gt": "?"}}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_commands_attributed_to_crud_method(
+    client: AsyncClient,
+) -> None:
+    command_metrics.reset()
+    await crud.account.get(_id=str(ObjectId()))
+    stats = command_metrics.stats()
+    assert stats["operations"]["CRUDAccount.get"]["count"] == 1
+    assert stats["collections"]["accounts"]["count"] == 1
+    assert stats["commands"]["find"]["count"] == 1
@@ -0,0 +1,47 @@
+import pytest
+from httpx import AsyncClient
+from pymongo import monitoring
+
+from app.core.monitoring import PoolStatsListener
+
+address = ("localhost", 27017)
+
+
+@pytest.mark.asyncio
+async def test_pool_stats(client: AsyncClient) -> None:
+    listener = PoolStatsListener()
+    listener.connection_created(monitoring.ConnectionCreatedEvent(address, 1))
+    listener.connection_created(monitoring.ConnectionCreatedEvent(address, 2))
+    for _ in range(3):
+        listener.connection_check_out_started(
+            monitoring.ConnectionCheckOutStartedEvent(address)
+        )
+    listener.connection_checked_out(
+        monitoring.ConnectionCheckedOutEvent(address, 1)
+    )
+    listener.connection_checked_out(
+        monitoring.ConnectionCheckedOutEvent(address, 2)
+    )
+    listener.connection_checked_in(
+        monitoring.ConnectionCheckedInEvent(address, 2)
+    )
+    stats = listener.stats()["localhost:27017"]
+    assert stats["open"] == 2
+    assert stats["checked_out"] == 1
+    assert stats["checked_out_total"] == 2
+    assert stats["wait_queue"] == 1
+    assert stats["connections_created_per_minute"] == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_prunes_connection_creations(
+    client: AsyncClient,
+) -> None:
+    listener = PoolStatsListener()
+    listener.rate_window = 0
+    for connection_id in range(100):
+        listener.connection_created(
+            monitoring.ConnectionCreatedEvent(address, connection_id)
+        )
+    # Without polling the stats
+    assert len(listener._created_at["localhost:27017"]) <= 1
@@ -0,0 +1,81 @@
+import time
+from typing import Optional
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from app.core.profiling import Profile, ProfileStore, ProfilingMiddleware
+
+
+def busy_wait(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def build_app(store: ProfileStore) -> FastAPI:
+    async def authorize(authorization: Optional[str]) -> bool:
+        return authorization == "Bearer admin"
+
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        busy_wait(0.05)
+        return {"result": "ok"}
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        authorize=authorize,
+        store=store,
+        interval=0.001,
+        max_seconds=5,
+    )
+    return app
+
+
+@pytest.mark.asyncio
+async def test_profile_request(client: AsyncClient) -> None:
+    store = ProfileStore(maxlen=2)
+    app = build_app(store)
+    async with AsyncClient(app=app, base_url="http://app.io") as app_client:
+        r = await app_client.get(
+            "/work",
+            headers={"X-Profile": "1", "Authorization": "Bearer admin"},
+        )
+    assert r.status_code == 200
+    profile = store.get(r.headers["x-profile-id"])
+    assert profile.path == "/work"
+    assert profile.samples > 0
+    assert "busy_wait" in profile.collapsed()
+    assert store.list()[0]["id"] == profile.id
+
+
+@pytest.mark.asyncio
+async def test_profile_request_not_profiled(client: AsyncClient) -> None:
+    store = ProfileStore(maxlen=2)
+    app = build_app(store)
+    async with AsyncClient(app=app, base_url="http://app.io") as app_client:
+        # Without the profile header or by an unauthorized user
+        r_without_header = await app_client.get(
+            "/work", headers={"Authorization": "Bearer admin"}
+        )
+        r_unauthorized = await app_client.get(
+            "/work", headers={"X-Profile": "1", "Authorization": "Bearer x"}
+        )
+    for r in (r_without_header, r_unauthorized):
+        assert r.status_code == 200
+        assert "x-profile-id" not in r.headers
+    assert store.list() == []
+
+
+def test_profile_store_keeps_the_latest() -> None:
+    store = ProfileStore(maxlen=2)
+    profiles = [
+        Profile(method="GET", path=path) for path in ("/a", "/b", "/c")
+    ]
+    for profile in profiles:
+        store.add(profile)
+    assert [summary["path"] for summary in store.list()] == ["/c", "/b"]
+    assert store.get(profiles[0].id) is None
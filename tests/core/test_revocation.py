@@ -0,0 +1,105 @@
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.revocation import RevocationFilter
+
+
+class RevokedKeys:
+    """Revoked keys by creation date, loaded like crud.revoked_token"""
+
+    def __init__(self):
+        self.keys: Dict[str, datetime] = {}
+
+    def revoke(self, key: str) -> None:
+        self.keys[key] = datetime.utcnow()
+
+    async def load(
+        self, since: Optional[datetime] = None
+    ) -> AsyncIterator[str]:
+        for key, created_at in list(self.keys.items()):
+            if since is None or created_at >= since:
+                yield key
+
+
+def get_revocation_filter(revoked_keys: RevokedKeys) -> RevocationFilter:
+    revocation_filter = RevocationFilter(
+        capacity=100, error_rate=0.001, interval=60, rebuild_interval=600
+    )
+    revocation_filter.loader = revoked_keys.load
+    return revocation_filter
+
+
+@pytest.mark.asyncio
+async def test_revocation_filter_sync(client: AsyncClient) -> None:
+    revoked_keys = RevokedKeys()
+    revoked_keys.revoke("first")
+    revocation_filter = get_revocation_filter(revoked_keys)
+    assert "first" not in revocation_filter
+    await revocation_filter.sync()
+    assert "first" in revocation_filter
+    # Revoked by another worker, then by this one
+    revoked_keys.revoke("second")
+    revocation_filter.add("third")
+    assert "second" not in revocation_filter
+    assert "third" in revocation_filter
+    await revocation_filter.sync()
+    assert "second" in revocation_filter
+    stats = revocation_filter.stats()
+    assert stats["syncs"] == 2
+    assert stats["rebuilds"] == 1
+
+
+@pytest.mark.asyncio
+async def test_revocation_filter_sync_counts_keys_once(
+    client: AsyncClient,
+) -> None:
+    revoked_keys = RevokedKeys()
+    revocation_filter = get_revocation_filter(revoked_keys)
+    await revocation_filter.sync()
+    revoked_keys.revoke("first")
+    revoked_keys.revoke("second")
+    revocation_filter.add("second")
+    await revocation_filter.sync()
+    assert len(revocation_filter.filter) == 2
+    # Same keys, in the overlap window of the last sync
+    await revocation_filter.sync()
+    assert len(revocation_filter.filter) == 2
+
+
+@pytest.mark.asyncio
+async def test_revocation_filter_rebuild(client: AsyncClient) -> None:
+    revoked_keys = RevokedKeys()
+    for i in range(300):
+        revoked_keys.revoke(f"key{i}")
+    revocation_filter = get_revocation_filter(revoked_keys)
+    await revocation_filter.sync()
+    # Sized for the revoked keys, not the configured capacity
+    assert revocation_filter.stats()["capacity"] == 600
+    assert all(f"key{i}" in revocation_filter for i in range(300))
+    # Expired (removed by the TTL index)
+    del revoked_keys.keys["key0"]
+    await revocation_filter.sync(rebuild=True)
+    assert "key0" not in revocation_filter
+    assert len(revocation_filter.filter) == 299
+
+
+@pytest.mark.asyncio
+async def test_revocation_filter_keeps_keys_added_while_rebuilding(
+    client: AsyncClient,
+) -> None:
+    revoked_keys = RevokedKeys()
+    revoked_keys.revoke("first")
+    revocation_filter = get_revocation_filter(revoked_keys)
+
+    async def load(since: Optional[datetime] = None) -> AsyncIterator[str]:
+        revocation_filter.add("added")
+        async for key in revoked_keys.load(since):
+            yield key
+
+    revocation_filter.loader = load
+    await revocation_filter.sync(rebuild=True)
+    assert "first" in revocation_filter
+    assert "added" in revocation_filter
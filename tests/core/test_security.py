@@ -0,0 +1,174 @@
+import time
+
+import pytest
+import rsa
+from httpx import AsyncClient
+from jose import jwt
+
+from app.core.security import (
+    JWT_BACKENDS,
+    InvalidTokenError,
+    base64url_encode,
+    get_jwt_backend,
+    pyjwt,
+)
+
+secret_key = "secret"
+available_backends = [
+    name for name in JWT_BACKENDS if name != "pyjwt" or pyjwt is not None
+]
+rs256_backends = ["jose"]
+# PyJWT signs with RS256 only with cryptography installed
+if pyjwt is not None and "RS256" in pyjwt.algorithms.get_default_algorithms():
+    rs256_backends.append("pyjwt")
+# Small keys, generated once by the pure Python rsa package
+rsa_keys = {
+    kid: rsa.newkeys(1024)[1].save_pkcs1().decode()
+    for kid in ("2021-10", "2021-11")
+}
+
+
+def get_backend(name: str):
+    return get_jwt_backend(name, secret_key=secret_key, algorithm="HS256")
+
+
+def get_rs256_backend(name: str, signing_kid: str, *kids: str):
+    return get_jwt_backend(
+        name,
+        secret_key=secret_key,
+        algorithm="RS256",
+        signing_keys={kid: rsa_keys[kid] for kid in (signing_kid, *kids)},
+        signing_kid=signing_kid,
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("issuer", available_backends)
+@pytest.mark.parametrize("verifier", available_backends)
+async def test_jwt_backends_are_interchangeable(
+    client: AsyncClient, issuer: str, verifier: str
+) -> None:
+    claims = {"exp": int(time.time()) + 60, "id": "user", "ver": 1}
+    token = get_backend(issuer).encode(claims)
+    assert get_backend(verifier).decode(token) == claims
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", available_backends)
+async def test_jwt_backends_reject_invalid_tokens(
+    client: AsyncClient, name: str
+) -> None:
+    backend = get_backend(name)
+    now = int(time.time())
+    header, claims, signature = backend.encode(
+        {"exp": now + 60, "id": "user"}
+    ).split(".")
+    none_header = base64url_encode(b'{"alg":"none","typ":"JWT"}').decode()
+    invalid_tokens = [
+        # Expired, not yet valid, without exp
+        backend.encode({"exp": now - 1, "id": "user"}),
+        backend.encode({"exp": now + 60, "nbf": now + 60, "id": "user"}),
+        backend.encode({"id": "user"}),
+        # Another key, the "none" algorithm, tampered and malformed
+        get_jwt_backend(name, secret_key="other", algorithm="HS256").encode(
+            {"exp": now + 60, "id": "user"}
+        ),
+        f"{none_header}.{claims}.",
+        f"{header}.{base64url_encode(b'{}').decode()}.{signature}",
+        f"{header}.{claims}",
+        "not a token",
+    ]
+    for token in invalid_tokens:
+        with pytest.raises(InvalidTokenError):
+            backend.decode(token)
+
+
+@pytest.mark.asyncio
+async def test_hs256_backend_has_no_asymmetric_keys(
+    client: AsyncClient,
+) -> None:
+    backend = get_jwt_backend(
+        "hs256", secret_key=secret_key, algorithm="HS256"
+    )
+    assert backend.jwks() == {"keys": []}
+    with pytest.raises(ValueError):
+        backend.load_key(rsa_keys[next(iter(rsa_keys))])
+    with pytest.raises(ValueError):
+        backend.public_jwk(None)
+
+
+@pytest.mark.asyncio
+async def test_get_jwt_backend_with_unsupported_options(
+    client: AsyncClient,
+) -> None:
+    with pytest.raises(ValueError):
+        get_jwt_backend("unknown", secret_key=secret_key, algorithm="HS256")
+    with pytest.raises(ValueError):
+        get_jwt_backend("hs256", secret_key=secret_key, algorithm="HS512")
+    with pytest.raises(ValueError):
+        get_jwt_backend("hs256", secret_key=secret_key, algorithm="RS256")
+    # Without the key of the signing kid, or with an invalid one
+    with pytest.raises(ValueError):
+        get_jwt_backend(
+            "jose",
+            secret_key=secret_key,
+            algorithm="RS256",
+            signing_keys=rsa_keys,
+            signing_kid="unknown",
+        )
+    with pytest.raises(ValueError):
+        get_jwt_backend(
+            "jose",
+            secret_key=secret_key,
+            algorithm="RS256",
+            signing_keys={"kid": "not a key"},
+            signing_kid="kid",
+        )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", rs256_backends)
+async def test_rs256_tokens_with_key_rotation(
+    client: AsyncClient, name: str
+) -> None:
+    claims = {"exp": int(time.time()) + 60, "id": "user", "ver": 1}
+    old_backend = get_rs256_backend(name, "2021-10")
+    # The new key is the signing one, the old key still verifies
+    new_backend = get_rs256_backend(name, "2021-11", "2021-10")
+    old_token = old_backend.encode(claims)
+    new_token = new_backend.encode(claims)
+    assert jwt.get_unverified_header(old_token)["kid"] == "2021-10"
+    assert jwt.get_unverified_header(new_token)["kid"] == "2021-11"
+    assert new_backend.decode(old_token) == claims
+    assert new_backend.decode(new_token) == claims
+    # Unknown kid, signature of another kid and an HMAC signed token
+    header, payload, signature = new_token.split(".")
+    other_kid_header = old_token.split(".")[0]
+    invalid_tokens = [
+        new_token,
+        f"{other_kid_header}.{payload}.{signature}",
+        get_backend("jose").encode(claims),
+    ]
+    for token in invalid_tokens:
+        with pytest.raises(InvalidTokenError):
+            old_backend.decode(token)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", rs256_backends)
+async def test_jwks(client: AsyncClient, name: str) -> None:
+    backend = get_rs256_backend(name, "2021-11", "2021-10")
+    jwks = backend.jwks()
+    assert [key["kid"] for key in jwks["keys"]] == ["2021-11", "2021-10"]
+    for key in jwks["keys"]:
+        assert key["kty"] == "RSA"
+        assert key["alg"] == "RS256"
+        assert key["use"] == "sig"
+        assert "d" not in key
+    # A consumer verifies the tokens with the JWKS only
+    claims = {"exp": int(time.time()) + 60, "id": "user"}
+    assert (
+        jwt.decode(backend.encode(claims), jwks, algorithms=["RS256"])
+        == claims
+    )
+    assert get_backend(name).jwks() == {"keys": []}
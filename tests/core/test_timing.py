@@ -0,0 +1,55 @@
+import asyncio
+import re
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from httpx import AsyncClient
+
+from app.core.timing import (
+    TimedRoute,
+    TimingMiddleware,
+    measure,
+    request_timing,
+)
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header(client: AsyncClient) -> None:
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/sleep")
+    async def sleep():
+        with measure("db"):
+            await asyncio.sleep(0.01)
+        return {"result": "ok"}
+
+    app = FastAPI()
+    # include_router builds the routes again, the endpoint is timed once
+    app.include_router(router, prefix="/timed")
+    app.add_middleware(TimingMiddleware)
+    async with AsyncClient(app=app, base_url="http://app.io") as app_client:
+        r = await app_client.get("/timed/sleep")
+    durations = dict(
+        re.findall(r"(\w+);dur=([\d.]+)", r.headers["server-timing"])
+    )
+    assert set(durations) == {"db", "endpoint", "encode", "total"}
+    assert float(durations["db"]) >= 10
+    assert float(durations["endpoint"]) <= float(durations["total"])
+
+
+@pytest.mark.asyncio
+async def test_db_commands_header(client: AsyncClient) -> None:
+    app = FastAPI()
+
+    @app.get("/commands")
+    async def commands():
+        request_timing.get().db_commands += 2
+        return {"result": "ok"}
+
+    app.add_middleware(
+        TimingMiddleware, server_timing_header=False, db_commands_header=True
+    )
+    async with AsyncClient(app=app, base_url="http://app.io") as app_client:
+        r = await app_client.get("/commands")
+    assert r.headers["x-db-commands"] == "2"
+    assert "server-timing" not in r.headers
@@ -1,5 +1,7 @@
 import pytest
+from bson import ObjectId
 from faker import Faker
+from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
 from httpx import AsyncClient
 
@@ -122,3 +124,38 @@ async def test_partial_remove_account(client: AsyncClient) -> None:
     assert found_account_removed.name == account_name
     assert found_account_removed.description == account_description
     assert not found_account_removed.is_active
+
+
+@pytest.mark.asyncio
+async def test_update_and_remove_account_not_exists(
+    client: AsyncClient,
+) -> None:
+    account_id = str(ObjectId())
+    account_in_update = schemas.AccountUpdate(name=faker_data.name())
+    updated_account = await crud.account._update(
+        _id=account_id, obj_in=account_in_update
+    )
+    removed_partial_account = await crud.account.partial_remove(_id=account_id)
+    account_deleted = await crud.account._remove(_id=account_id)
+    assert updated_account is None
+    assert removed_partial_account is None
+    assert account_deleted == 0
+
+
+@pytest.mark.asyncio
+async def test_create_account_with_exists_name(client: AsyncClient) -> None:
+    account_name = faker_data.name()
+    account_in = schemas.AccountCreate(
+        name=account_name, description=faker_data.paragraph()
+    )
+    account = await crud.account.create(obj_in=account_in)
+    with pytest.raises(HTTPException) as exc_info:
+        await crud.account.create(obj_in=account_in)
+    assert exc_info.value.status_code == 409
+    assert exc_info.value.detail == (
+        f"An account with name <<{account_name}>> already exists"
+    )
+    # The name of a removed account can be used again
+    await crud.account.partial_remove(_id=account.id)
+    account_2 = await crud.account.create(obj_in=account_in)
+    assert account_2.name == account_name
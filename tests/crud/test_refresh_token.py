@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+from bson.objectid import ObjectId
+from httpx import AsyncClient
+
+from app import crud
+from app.core.security import get_refresh_token_hash
+from app.models.refresh_token import RefreshToken
+
+
+async def issue_refresh_token(**kwargs):
+    user_id = ObjectId()
+    claims = {"id": str(user_id), "role": "GUEST", "ver": 0}
+    return await crud.refresh_token.issue(
+        user_id=user_id, claims=claims, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_issue_refresh_token(client: AsyncClient) -> None:
+    token, refresh_token = await issue_refresh_token()
+    assert type(refresh_token) is RefreshToken
+    assert refresh_token.token_hash == get_refresh_token_hash(token)
+    assert token not in str(refresh_token.to_mongo())
+    assert refresh_token.expires_at > datetime.utcnow()
+    assert refresh_token.is_active
+
+
+@pytest.mark.asyncio
+async def test_rotate_refresh_token(client: AsyncClient) -> None:
+    token, refresh_token = await issue_refresh_token()
+    rotated = await crud.refresh_token.rotate(token=token)
+    assert rotated.id == refresh_token.id
+    assert rotated.claims == refresh_token.claims
+    assert await crud.refresh_token.rotate(token="not a token") is None
+
+
+@pytest.mark.asyncio
+async def test_rotate_reused_refresh_token(client: AsyncClient) -> None:
+    token, refresh_token = await issue_refresh_token()
+    await crud.refresh_token.rotate(token=token)
+    next_token, _ = await issue_refresh_token(
+        family_id=refresh_token.family_id
+    )
+    other_token, _ = await issue_refresh_token()
+    # Reused, the whole family is revoked
+    assert await crud.refresh_token.rotate(token=token) is None
+    assert await crud.refresh_token.rotate(token=next_token) is None
+    assert await crud.refresh_token.rotate(token=other_token)
+
+
+@pytest.mark.asyncio
+async def test_rotate_expired_refresh_token(client: AsyncClient) -> None:
+    token, refresh_token = await issue_refresh_token()
+    await RefreshToken.collection.update_one(
+        {"_id": refresh_token.id},
+        {"$set": {"expires_at": datetime.utcnow()}},
+    )
+    assert await crud.refresh_token.rotate(token=token) is None
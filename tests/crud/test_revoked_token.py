@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson.objectid import ObjectId
+from httpx import AsyncClient
+
+from app import crud
+from app.core.revocation import revocation_filter
+from app.crud.revoked_token import get_jti_key, get_user_version_key
+
+
+@pytest.mark.asyncio
+async def test_revoke_token(client: AsyncClient) -> None:
+    key = get_jti_key(str(ObjectId()))
+    assert not await crud.revoked_token.is_revoked(keys=[key])
+    await crud.revoked_token.revoke(
+        key=key, expires_at=datetime.utcnow() + timedelta(minutes=1)
+    )
+    assert key in revocation_filter
+    assert await crud.revoked_token.is_revoked(keys=["other", key])
+    # Revoking twice keeps a single document
+    await crud.revoked_token.revoke(
+        key=key, expires_at=datetime.utcnow() + timedelta(minutes=1)
+    )
+    assert [key async for key in crud.revoked_token.iter_keys()] == [key]
+
+
+@pytest.mark.asyncio
+async def test_revoke_user_version(client: AsyncClient) -> None:
+    user_id = ObjectId()
+    await crud.revoked_token.revoke_user_version(
+        user_id=user_id, token_version=0
+    )
+    assert await crud.revoked_token.is_revoked(
+        keys=[get_user_version_key(user_id, 0)]
+    )
+    assert not await crud.revoked_token.is_revoked(
+        keys=[get_user_version_key(user_id, 1)]
+    )
+
+
+@pytest.mark.asyncio
+async def test_revoked_token_expired(client: AsyncClient) -> None:
+    key = get_jti_key(str(ObjectId()))
+    await crud.revoked_token.revoke(key=key, expires_at=datetime.utcnow())
+    # Still in the filter until it is rebuilt, not in the database
+    false_positives = revocation_filter.false_positives
+    assert not await crud.revoked_token.is_revoked(keys=[key])
+    assert revocation_filter.false_positives == false_positives + 1
+    assert [key async for key in crud.revoked_token.iter_keys()] == []
+
+
+@pytest.mark.asyncio
+async def test_iter_revoked_keys_since(client: AsyncClient) -> None:
+    expires_at = datetime.utcnow() + timedelta(minutes=1)
+    await crud.revoked_token.revoke(key="first", expires_at=expires_at)
+    since = datetime.utcnow()
+    # The dates are stored with millisecond precision
+    await asyncio.sleep(0.002)
+    await crud.revoked_token.revoke(key="second", expires_at=expires_at)
+    keys = [key async for key in crud.revoked_token.iter_keys(since)]
+    assert keys == ["second"]
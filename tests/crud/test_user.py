@@ -7,6 +7,7 @@ from httpx import AsyncClient
 from app import crud, schemas
 from app.core.security import verify_password
 from app.models.user import User
+from app.schemas.user import UserInDB
 from tests.config import settings_test
 
 faker_data = Faker(locale=settings_test.FAKER_DATA_LOCATE)
@@ -104,6 +105,43 @@ async def test_get_user_by_email(client: AsyncClient) -> None:
     assert jsonable_encoder(user) == jsonable_encoder(user_2)
 
 
+@pytest.mark.asyncio
+async def test_get_user_by_email_with_account_and_role(
+    client: AsyncClient,
+) -> None:
+    account_in = schemas.AccountCreate(name=faker_data.company())
+    account = await crud.account.create(obj_in=account_in)
+    role_in = schemas.RoleCreate(name=faker_data.job())
+    role = await crud.role.create(obj_in=role_in)
+    fake_email = faker_data.email()
+    user_in = schemas.UserCreate(
+        email=fake_email,
+        password=faker_data.password(length=12),
+        full_name=faker_data.name(),
+        phone_number=faker_data.random_number(digits=10),
+        account_id=str(account.id),
+    )
+    user = await crud.user.create(obj_in=user_in)
+    user_role_in = schemas.UserRoleCreate(
+        user_id=str(user.id), role_id=str(role.id)
+    )
+    await crud.user_role.create(obj_in=user_role_in)
+
+    user_found = await crud.user.get_by_email(email=fake_email)
+    assert type(user_found) is UserInDB
+    assert user_found.id == user.id
+    assert user_found.account["name"] == account.name
+    assert user_found.role["name"] == role.name
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_email_without_exists_user(
+    client: AsyncClient,
+) -> None:
+    user_found = await crud.user.get_by_email(email=faker_data.email())
+    assert user_found is None
+
+
 @pytest.mark.asyncio
 async def test_update_user(client: AsyncClient) -> None:
     fake_email = faker_data.email()
@@ -189,6 +227,40 @@ async def test_get_users_by_account_id(client: AsyncClient) -> None:
     assert type(users_found_by_account_id[0]) is User
 
 
+@pytest.mark.asyncio
+async def test_get_users_with_cursor(client: AsyncClient) -> None:
+    users_created = []
+    users_to_create = 5
+    for _ in range(users_to_create):
+        user_in = schemas.UserCreate(
+            email=faker_data.email(),
+            password=faker_data.password(length=12),
+            full_name=faker_data.name(),
+            phone_number=faker_data.random_number(digits=10),
+            account_id=str(ObjectId()),
+        )
+        user_created = await crud.user.create(obj_in=user_in)
+        users_created.append(user_created)
+
+    page_size = 2
+    users_found = []
+    cursor = None
+    while True:
+        users = await crud.user.get_multi(limit=page_size, cursor=cursor)
+        users_found.extend(users)
+        cursor = crud.user.get_next_cursor(objects=users, limit=page_size)
+        if not cursor:
+            break
+    assert len(users_found) == users_to_create
+    assert {user.id for user in users_found} == {
+        user.id for user in users_created
+    }
+    assert [user.id for user in users_found] == [
+        user.id
+        for user in await crud.user.get_multi(skip=0, limit=users_to_create)
+    ]
+
+
 @pytest.mark.asyncio
 async def test_partial_remove_user(client: AsyncClient) -> None:
     fake_email = faker_data.email()
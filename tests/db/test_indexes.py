@@ -0,0 +1,36 @@
+from typing import Any
+
+import pytest
+from httpx import AsyncClient
+
+from app.db.indexes import MODELS, ensure_indexes, get_indexes_report
+from app.models import User
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes(client: AsyncClient, db: Any) -> None:
+    await ensure_indexes()
+    for model in MODELS:
+        existing = await model.collection.index_information()
+        for index in model.indexes:
+            assert index.document["name"] in existing
+
+
+@pytest.mark.asyncio
+async def test_indexes_report(client: AsyncClient, db: Any) -> None:
+    await ensure_indexes()
+    report = await get_indexes_report()
+    for model in MODELS:
+        collection_report = report[model.collection.name]
+        assert collection_report["missing"] == []
+        assert collection_report["undeclared"] == []
+
+
+@pytest.mark.asyncio
+async def test_indexes_report_with_missing_index(
+    client: AsyncClient, db: Any
+) -> None:
+    await ensure_indexes()
+    await User.collection.drop_index("email_1")
+    report = await get_indexes_report()
+    assert report[User.collection.name]["missing"] == ["email_1"]
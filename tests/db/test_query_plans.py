@@ -0,0 +1,213 @@
+"""
+Query plan regression suite: the query shapes issued by the CRUD layer
+(captured with a command listener while calling the CRUD methods on a
+seeded dataset) are explained with the "executionStats" verbosity, and
+fail on collection scans (of the query or of a $lookup stage) or when they
+examine more than MAX_DOCS_EXAMINED_RATIO documents per returned one.
+"""
+import argparse
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+import pytest
+from httpx import AsyncClient
+from pymongo import monitoring
+
+from app import crud
+from app.core.metrics import db_operation
+from benchmarks.dataset import load_dataset
+
+# Commands whose plan is checked, the writes filter by _id (and is_active)
+# like CRUDBase.get
+EXPLAINED_COMMANDS = {"find", "aggregate"}
+MAX_DOCS_EXAMINED_RATIO = 2
+
+
+class CommandRecorder(monitoring.CommandListener):
+    def __init__(self):
+        self.recording: bool = False
+        self.commands: List[Dict] = []
+
+    def started(self, event):
+        if self.recording and event.command_name in EXPLAINED_COMMANDS:
+            self.commands.append(
+                {
+                    "operation": db_operation.get(),
+                    "command": {
+                        # Without the session and cluster fields
+                        key: value
+                        for key, value in event.command.items()
+                        if not key.startswith("$") and key != "lsid"
+                    },
+                }
+            )
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    @contextmanager
+    def record(self) -> Iterator[List[Dict]]:
+        self.commands = []
+        self.recording = True
+        try:
+            yield self.commands
+        finally:
+            self.recording = False
+
+
+# Registered globally, so the clients created by the db fixture publish
+# their commands to it
+recorder = CommandRecorder()
+monitoring.register(recorder)
+
+
+def iter_plan_stages(plan: Dict) -> Iterator[Dict]:
+    yield plan
+    for child in (plan.get("inputStage"), plan.get("innerStage")):
+        if child:
+            yield from iter_plan_stages(child)
+    for child in plan.get("inputStages", []):
+        yield from iter_plan_stages(child)
+
+
+def get_plan_problems(explain: Dict) -> List[str]:
+    """
+    Collection scans and high docs examined / returned ratios of the
+    explain output of a find or an aggregate (with its $lookup stages)
+    """
+    problems = []
+    cursor_stages = [
+        stage["$cursor"]
+        for stage in explain.get("stages", [])
+        if "$cursor" in stage
+    ] or [explain]
+    for cursor_stage in cursor_stages:
+        winning_plan = cursor_stage["queryPlanner"]["winningPlan"]
+        # The plan may be wrapped by the slot based engine
+        winning_plan = winning_plan.get("queryPlan", winning_plan)
+        for stage in iter_plan_stages(winning_plan):
+            if stage["stage"] == "COLLSCAN":
+                problems.append("COLLSCAN")
+        stats = cursor_stage["executionStats"]
+        ratio = stats["totalDocsExamined"] / max(stats["nReturned"], 1)
+        if ratio > MAX_DOCS_EXAMINED_RATIO:
+            problems.append(f"{ratio:.1f} docs examined per returned")
+    for stage in explain.get("stages", []):
+        lookup = stage.get("$lookup")
+        if lookup is None:
+            continue
+        name = f"$lookup from {lookup['from']}"
+        if stage.get("collectionScans"):
+            problems.append(f"COLLSCAN in {name}")
+        ratio = stage.get("totalDocsExamined", 0) / max(
+            stage.get("nReturned", 0), 1
+        )
+        if ratio > MAX_DOCS_EXAMINED_RATIO:
+            problems.append(
+                f"{ratio:.1f} docs examined per returned in {name}"
+            )
+    return problems
+
+
+async def assert_query_plans(db: Any, commands: List[Dict]) -> None:
+    assert commands
+    failures = []
+    for recorded in commands:
+        explain = await db.command(
+            {"explain": recorded["command"], "verbosity": "executionStats"}
+        )
+        problems = get_plan_problems(explain)
+        if problems:
+            failures.append(
+                f"{recorded['operation']} {recorded['command']}: "
+                f"{', '.join(problems)}"
+            )
+    assert not failures, "\n".join(failures)
+
+
+@pytest.fixture()
+async def dataset(db: Any) -> Dict[str, Any]:
+    args = argparse.Namespace(
+        seed=42,
+        accounts=50,
+        users_per_account=20,
+        skew=1.1,
+        guest_users=100,
+        inactive_accounts=0.1,
+        inactive_users=0.1,
+        email_domain="plans.io",
+        batch_size=1000,
+    )
+    await load_dataset(db, args)
+    account = await db.accounts.find_one({"is_active": True})
+    user = await db.users.find_one(
+        {"account_id": account["_id"], "is_active": True}
+    )
+    guest_user = await db.users.find_one(
+        {"account_id": None, "is_active": True}
+    )
+    return {"account": account, "user": user, "guest_user": guest_user}
+
+
+@pytest.mark.asyncio
+async def test_account_and_role_query_plans(
+    client: AsyncClient, db: Any, dataset: Dict
+) -> None:
+    account = dataset["account"]
+    with recorder.record() as commands:
+        await crud.account.get(_id=str(account["_id"]))
+        await crud.account.get_by_name(name=account["name"])
+        accounts = await crud.account.get_multi(limit=10)
+        await crud.account.get_multi(
+            limit=10,
+            cursor=crud.account.get_next_cursor(objects=accounts, limit=10),
+        )
+        await crud.role.get_by_name(name="GUEST")
+        await crud.role.get_multi(limit=2)
+    await assert_query_plans(db, commands)
+
+
+@pytest.mark.asyncio
+async def test_user_query_plans(
+    client: AsyncClient, db: Any, dataset: Dict
+) -> None:
+    user, guest_user = dataset["user"], dataset["guest_user"]
+    with recorder.record() as commands:
+        await crud.user.get(_id=str(user["_id"]))
+        # The aggregation with the $lookup of accounts, user_roles and roles
+        await crud.user.get_by_email(email=user["email"])
+        await crud.user.get_by_email(email=guest_user["email"])
+        await crud.user.get_principal_claims(_id=str(user["_id"]))
+        users = await crud.user.get_multi(limit=10)
+        await crud.user.get_multi(
+            limit=10,
+            cursor=crud.user.get_next_cursor(objects=users, limit=10),
+        )
+        account_users = await crud.user.get_by_account_id(
+            account_id=user["account_id"], limit=5
+        )
+        await crud.user.get_by_account_id(
+            account_id=user["account_id"],
+            limit=5,
+            cursor=crud.user.get_next_cursor(objects=account_users, limit=5),
+        )
+        await crud.user_role.get_by_user_id(user_id=str(user["_id"]))
+        await crud.user_role.get_multi(limit=10)
+    await assert_query_plans(db, commands)
+
+
+@pytest.mark.asyncio
+async def test_plan_problems_of_collection_scan(
+    client: AsyncClient, db: Any, dataset: Dict
+) -> None:
+    # Not indexed field
+    explain = await db.command(
+        {
+            "explain": {"find": "users", "filter": {"phone_number": "1"}},
+            "verbosity": "executionStats",
+        }
+    )
+    assert "COLLSCAN" in get_plan_problems(explain)
@@ -1,4 +1,5 @@
 import pytest
+from bson import ObjectId
 from httpx import AsyncClient
 
 
@@ -8,3 +9,40 @@ async def test_health_check(client: AsyncClient) -> None:
     assert r.status_code == 200
     assert "result" in r.json()
     assert r.json()["result"] == "pong"
+
+
+@pytest.mark.asyncio
+async def test_metrics(client: AsyncClient) -> None:
+    await client.get("/ping")
+    await client.get(f"/not-exists/{ObjectId()}")
+    r = await client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    metrics = r.text
+    assert 'route="/ping",status="200"' in metrics
+    assert 'route="<unmatched>",status="404"' in metrics
+    assert "not-exists" not in metrics
+    assert "http_requests_in_flight 1" in metrics
+
+
+@pytest.mark.asyncio
+async def test_metrics_with_unknown_method(client: AsyncClient) -> None:
+    r = await client.request("BREW", "/ping")
+    assert r.status_code == 405
+    r = await client.get("/metrics")
+    metrics = r.text
+    assert "BREW" not in metrics
+    assert 'method="other",route="/ping",status="405"' in metrics
+
+
+@pytest.mark.asyncio
+async def test_jwks(client: AsyncClient) -> None:
+    r = await client.get("/.well-known/jwks.json")
+    assert r.status_code == 200
+    assert "keys" in r.json()
+    assert r.headers["cache-control"].startswith("public, max-age=")
+    r = await client.get(
+        "/.well-known/jwks.json",
+        headers={"If-None-Match": r.headers["etag"]},
+    )
+    assert r.status_code == 304
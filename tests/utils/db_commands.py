@@ -0,0 +1,11 @@
+from httpx import Response
+
+from app.core.timing import DB_COMMANDS_HEADER
+
+
+def get_db_commands(response: Response) -> int:
+    """
+    Database commands issued by the request (debug header enabled by the
+    DB_COMMANDS_HEADER setting of the tests), to assert the query budgets
+    """
+    return int(response.headers[DB_COMMANDS_HEADER.decode()])